@@ -0,0 +1,162 @@
+import asyncio
+import gzip
+import json
+import time
+import aiohttp
+from collections import deque
+from typing import Dict, Any, List, Tuple
+from mcp_client import backoff_delay, batch_request, batch_responses, classify_response, latency_summary
+
+class AsyncMCPClient:
+    """asyncio-native MCP client with the same methods as MCPClient.
+
+    Use it as an async context manager so the shared connection pool is
+    opened and closed on the running event loop::
+
+        async with AsyncMCPClient(url) as client:
+            cost, usage = await asyncio.gather(client.get_cost_analysis(), client.get_usage_metrics())
+    """
+
+    def __init__(self, server_url: str, max_concurrency: int = 50, pool_size: int = 100,
+                 timeout: float = 30, max_retries: int = 3, backoff_base: float = 0.5,
+                 backoff_max: float = 10.0, compress_requests: bool = False,
+                 compression_threshold: int = 1024, latency_window: int = 1000):
+        self.server_url = server_url
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.compress_requests = compress_requests
+        self.compression_threshold = compression_threshold
+        self.latencies = deque(maxlen=latency_window)
+        self.retries = 0
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _ensure_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Accept-Encoding': 'gzip'}
+            )
+            # Bounds in-flight requests regardless of how many callers are waiting
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        """Release pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def send_request(self, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Send MCP request"""
+        return await self._post({'method': method, 'params': params or {}})
+
+    async def send_batch(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Send several (method, params) calls in one request; responses in call order"""
+        if not calls:
+            return []
+        return batch_responses(await self._post(batch_request(calls)), len(calls))
+
+    async def _post(self, request_data: Any) -> Any:
+        """POST a request (or batch) under the concurrency limit, retrying transient failures"""
+        self._ensure_session()
+        payload = json.dumps(request_data).encode()
+
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        if self.compress_requests and len(payload) >= self.compression_threshold:
+            payload = gzip.compress(payload)
+            headers['Content-Encoding'] = 'gzip'
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            attempt = 0
+            while True:
+                retry_after = None
+                try:
+                    async with self._session.post(self.server_url, data=payload, headers=headers) as response:
+                        result, error, retry_after = classify_response(
+                            response.status, await response.text(), response.headers.get('Retry-After'))
+                        if error is None:
+                            break
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    error = {'error': f'Request failed: {str(e) or type(e).__name__}'}
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    result = {'error': f'Request failed: {str(e)}'}
+                    break
+
+                if attempt >= self.max_retries:
+                    result = error
+                    break
+                await asyncio.sleep(backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_max))
+                attempt += 1
+
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            self.retries += attempt
+            return result
+
+    def latency_stats(self) -> Dict[str, Any]:
+        """Latency percentiles (ms) over the most recent requests, retries included"""
+        return latency_summary(list(self.latencies), self.retries)
+
+    async def get_cost_analysis(self, days: int = 30, compact: bool = False, top_n: int = None,
+                                rollups: list = None) -> Dict[str, Any]:
+        """Get cost analysis from AWS"""
+        params = {'days': days}
+        if compact:
+            params.update({'format': 'compact', 'top_n': top_n, 'rollups': rollups or []})
+        return await self.send_request('get_cost_data', params)
+
+    async def get_cost_anomalies(self, days: int = 60, lookback_days: int = 1, threshold: float = None) -> Dict[str, Any]:
+        """Get per-service cost anomalies (computed on the server, no model call)"""
+        params = {'days': days, 'lookback_days': lookback_days}
+        if threshold is not None:
+            params['threshold'] = threshold
+        return await self.send_request('get_cost_anomalies', params)
+
+    async def get_cost_forecast(self, days: int = 90, horizon: int = 14, method: str = 'seasonal') -> Dict[str, Any]:
+        """Get a daily cost forecast"""
+        return await self.send_request('get_cost_forecast', {'days': days, 'horizon': horizon, 'method': method})
+
+    async def get_usage_metrics(self, service: str = 'AWS/EC2', metric: str = 'CPUUtilization') -> Dict[str, Any]:
+        """Get usage metrics"""
+        return await self.send_request('get_usage_metrics', {'service': service, 'metric': metric})
+
+    async def get_usage_metrics_batch(self, queries: list, hours: int = 24) -> Dict[str, Any]:
+        """Get many usage metrics in one request"""
+        return await self.send_request('get_usage_metrics_batch', {'queries': queries, 'hours': hours})
+
+    async def get_service_insights(self, services: list = None) -> Dict[str, Any]:
+        """Get service-level insights"""
+        return await self.send_request('get_service_insights', {'services': services or ['EC2', 'S3', 'RDS']})
+
+    async def get_rightsizing_candidates(self, days: int = 14, region: str = None, top_n: int = 50) -> Dict[str, Any]:
+        """Get idle and oversized EC2 instances"""
+        params = {'days': days, 'top_n': top_n}
+        if region:
+            params['region'] = region
+        return await self.send_request('get_rightsizing_candidates', params)
+
+    async def get_metrics(self, format: str = 'json') -> Dict[str, Any]:
+        """Get server latency histograms; ``format='prometheus'`` for exposition text"""
+        return await self.send_request('get_metrics', {'format': format})
+
+    async def get_ai_analysis(self, data: Any, token_budget: int = None) -> Dict[str, Any]:
+        """Get AI-powered cost optimization analysis; ``data`` may be a string or a cost result"""
+        params = {'data': data}
+        if token_budget is not None:
+            params['token_budget'] = token_budget
+        return await self.send_request('get_ai_analysis', params)
@@ -1,9 +1,100 @@
+import asyncio
 import json
-import schedule
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from mcp_client import MCPClient
-from typing import Dict, Any, List
+from scheduler import JobScheduler
+from result_store import ResultStore
+from cost_format import cost_matrix
+from typing import Dict, Any, Callable, List
+
+class TaskGraph:
+    """Small DAG executor: tasks declare dependencies and receive their results.
+
+    Each task function is called with a dict of its dependencies' results.
+    Independent tasks run concurrently on a worker pool; a task that raises
+    yields ``{'error': ...}`` so dependents can still decide what to do.
+    """
+    
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.tasks = {}
+    
+    def add(self, name: str, fn: Callable[[Dict[str, Any]], Any], depends_on: List[str] = None):
+        self.tasks[name] = {'fn': fn, 'depends_on': list(depends_on or [])}
+        return self
+    
+    def _check(self):
+        for name, task in self.tasks.items():
+            for dep in task['depends_on']:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task '{name}' depends on unknown task '{dep}'")
+        visited, active = set(), set()
+        
+        def visit(name):
+            if name in active:
+                raise ValueError(f"Dependency cycle through task '{name}'")
+            if name not in visited:
+                active.add(name)
+                for dep in self.tasks[name]['depends_on']:
+                    visit(dep)
+                active.discard(name)
+                visited.add(name)
+        
+        for name in self.tasks:
+            visit(name)
+    
+    def run(self):
+        """Execute the graph; returns (results, report) with per-task timings"""
+        self._check()
+        results, timings = {}, {}
+        remaining = dict(self.tasks)
+        started = time.perf_counter()
+        
+        def execute(name):
+            begin = time.perf_counter()
+            deps = {dep: results[dep] for dep in self.tasks[name]['depends_on']}
+            try:
+                value = self.tasks[name]['fn'](deps)
+            except Exception as e:
+                value = {'error': f"Task '{name}' failed: {str(e)}"}
+            end = time.perf_counter()
+            timings[name] = {
+                'start_ms': round((begin - started) * 1000, 3),
+                'duration_ms': round((end - begin) * 1000, 3)
+            }
+            return value
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while remaining or running:
+                for name in [n for n, t in remaining.items() if all(d in results for d in t['depends_on'])]:
+                    running[executor.submit(execute, name)] = name
+                    del remaining[name]
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        
+        ordered = {name: results[name] for name in self.tasks}
+        return ordered, {
+            'total_ms': round((time.perf_counter() - started) * 1000, 3),
+            'critical_path_ms': round(self._critical_path(timings), 3),
+            'tasks': timings
+        }
+    
+    def _critical_path(self, timings: Dict[str, Dict]) -> float:
+        """Longest dependency chain by measured task duration"""
+        longest = {}
+        
+        def path(name):
+            if name not in longest:
+                longest[name] = timings[name]['duration_ms'] + max(
+                    (path(dep) for dep in self.tasks[name]['depends_on']), default=0.0)
+            return longest[name]
+        
+        return max((path(name) for name in self.tasks), default=0.0)
 
 class MCPAutomationFramework:
     def __init__(self, config_file: str):
@@ -11,7 +102,15 @@ class MCPAutomationFramework:
             self.config = json.load(f)
         
         self.client = MCPClient(self.config['server_url'])
-        self.results = []
+        # Recent results only; full history lives in the append-only result store
+        self.results = deque(maxlen=self.config.get('results_buffer_size', 100))
+        self.result_store = None
+        if self.config.get('log_results', True):
+            self.result_store = ResultStore(
+                self.config.get('results_dir', 'mcp_results'),
+                retention_days=self.config.get('results_retention_days', 90)
+            )
+        self.last_run_report = None
     
     def run_cost_analysis(self):
         """Automated cost analysis"""
@@ -23,15 +122,20 @@ class MCPAutomationFramework:
         """Automated usage monitoring. Returns a list of results."""
         metrics = self.config.get('usage_metrics', [])
         
-        results_list = []
-        for metric_config in metrics:
-            result = self.client.get_usage_metrics(**metric_config)
-            results_list.append(result)
+        # One batched request instead of one round trip per metric
+        batch = self.client.get_usage_metrics_batch(metrics)
+        results_list = self._usage_results(batch, metrics)
         
         # This operation's result is the list itself.
         self._store_result('usage_monitoring', results_list)
         return results_list # Always return the list of results
     
+    def _usage_results(self, batch: Dict[str, Any], metrics: List[Dict]) -> List[Dict[str, Any]]:
+        """Split a get_usage_metrics_batch response into one response per metric"""
+        if 'result' in batch:
+            return [{'result': result} for result in batch['result']['results']]
+        return [{'error': batch.get('error', 'Unknown error')} for _ in metrics]
+    
     def run_service_audit(self):
         """Automated service insights audit"""
         services = self.config.get('audit_services', ['EC2', 'S3', 'RDS'])
@@ -39,14 +143,26 @@ class MCPAutomationFramework:
         self._store_result('service_audit', result)
         return result
     
-    def run_ai_analysis(self):
-        """Run AI-powered cost optimization analysis"""
-        cost_result = self.client.get_cost_analysis(days=7)
+    def run_ai_analysis(self, cost_result: Dict[str, Any] = None, days: int = 7):
+        """Run AI-powered cost optimization analysis.
+
+        When ``cost_result`` (a get_cost_data response) is given, its last
+        ``days`` days are analysed instead of fetching cost data again.
+        """
+        if cost_result is None:
+            cost_result = self.client.get_cost_analysis(days=days)
         
         if 'result' in cost_result:
-            import json
-            cost_data = json.dumps(cost_result['result'], indent=2)
-            ai_result = self.client.get_ai_analysis(cost_data)
+            result = cost_result['result']
+            cost_data = result.get('cost_data')
+            if isinstance(cost_data, list) and len(cost_data) > days:
+                recent = cost_data[-days:]
+                result = {
+                    'period': f"{recent[0]['TimePeriod']['Start']} to {recent[-1]['TimePeriod']['End']}",
+                    'cost_data': recent
+                }
+            # The server summarizes the raw result to fit its prompt token budget
+            ai_result = self.client.get_ai_analysis(result)
             self._store_result('ai_analysis', ai_result)
             return ai_result
         else:
@@ -63,26 +179,117 @@ class MCPAutomationFramework:
         }
         self.results.append(entry)
         
-        if self.config.get('log_results', True):
-            with open(f'mcp_results_{operation}.json', 'w') as f:
-                json.dump(entry, f, indent=2)
+        if self.result_store is not None:
+            # Queued; the store's writer thread does the disk I/O
+            self.result_store.append(entry)
+    
+    def query_results(self, operation: str = None, last_n: int = 10) -> List[Dict[str, Any]]:
+        """Stored results of the last N runs, oldest first"""
+        if self.result_store is None:
+            return [e for e in self.results if operation is None or e['operation'] == operation][-last_n:]
+        self.result_store.flush()
+        return self.result_store.query(operation, last_n)
+    
+    def cost_trend(self, last_n: int = 30) -> List[Dict[str, Any]]:
+        """Total cost reported by each of the last N cost analysis runs"""
+        def total(result):
+            data = result['result']
+            if data.get('format') == 'compact':
+                return round(sum(data['values']['amount']), 4)
+            _, _, matrix = cost_matrix(data['cost_data'])
+            return round(sum(sum(row) for row in matrix), 4)
+        
+        if self.result_store is None:
+            return []
+        self.result_store.flush()
+        return self.result_store.trend('cost_analysis', total, last_n)
+    
+    def close(self):
+        """Flush pending results and release the client's connections"""
+        if self.result_store is not None:
+            self.result_store.close()
+        self.client.close()
     
     def schedule_automation(self):
         """Schedule automated tasks"""
-        schedule.every().day.at("09:00").do(self.run_cost_analysis)
-        schedule.every(4).hours.do(self.run_usage_monitoring)
-        schedule.every().week.do(self.run_service_audit)
+        scheduler = JobScheduler(
+            state_file=self.config.get('scheduler_state_file', 'mcp_scheduler_state.json'),
+            max_workers=self.config.get('max_workers', 4),
+            metrics_file=self.config.get('scheduler_metrics_file')
+        )
+        scheduler.daily_at("09:00", 'cost_analysis', self.run_cost_analysis, timeout=900, jitter=60)
+        scheduler.every(4 * 3600, 'usage_monitoring', self.run_usage_monitoring, timeout=600, jitter=60)
+        scheduler.every(7 * 24 * 3600, 'service_audit', self.run_service_audit, timeout=1800, jitter=300)
         
         print("MCP Automation Framework started...")
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
+        try:
+            scheduler.run_forever()
+        finally:
+            scheduler.stop(wait=False)
+            if self.result_store is not None:
+                self.result_store.close()
+    
+    def build_task_graph(self) -> TaskGraph:
+        """Operations of one run and their dependencies"""
+        graph = TaskGraph(max_workers=self.config.get('max_workers', 4))
+        graph.add('cost_analysis', lambda deps: self.run_cost_analysis())
+        graph.add('usage_monitoring', lambda deps: self.run_usage_monitoring())
+        graph.add('service_audit', lambda deps: self.run_service_audit())
+        if self.config.get('include_ai_analysis', False):
+            # Reuses the cost data fetched by cost_analysis instead of re-fetching it
+            graph.add('ai_analysis', lambda deps: self.run_ai_analysis(deps['cost_analysis']),
+                      depends_on=['cost_analysis'])
+        return graph
+    
+    def run_once(self, batch: bool = False) -> Dict[str, Any]:
+        """Run all operations once and return a dictionary of their results.
+
+        Operations run as a task graph, concurrently where independent; the
+        timing report is kept in ``last_run_report``. With ``batch=True`` the
+        three core operations go out as a single batch request instead.
+        """
+        if not batch:
+            results, self.last_run_report = self.build_task_graph().run()
+            return results
+        
+        metrics = self.config.get('usage_metrics', [])
+        
+        # All three operations go out as a single batch request
+        cost, usage, audit = self.client.send_batch([
+            ('get_cost_data', {'days': self.config.get('cost_analysis_days', 30)}),
+            ('get_usage_metrics_batch', {'queries': metrics, 'hours': 24}),
+            ('get_service_insights', {'services': self.config.get('audit_services', ['EC2', 'S3', 'RDS'])})
+        ])
+        
+        results = {
+            'cost_analysis': cost,
+            'usage_monitoring': self._usage_results(usage, metrics),
+            'service_audit': audit
+        }
+        for operation, result in results.items():
+            self._store_result(operation, result)
+        return results
     
-    def run_once(self) -> Dict[str, Any]:
-        """Run all operations once and return a dictionary of their results."""
+    async def run_once_async(self, max_concurrency: int = 10) -> Dict[str, Any]:
+        """Run all operations once, firing independent requests concurrently.
+
+        Returns the same dictionary as run_once.
+        """
+        from async_mcp_client import AsyncMCPClient
+        
+        metrics = self.config.get('usage_metrics', [])
+        async with AsyncMCPClient(self.config['server_url'], max_concurrency=max_concurrency) as client:
+            cost, usage, audit = await asyncio.gather(
+                client.get_cost_analysis(self.config.get('cost_analysis_days', 30)),
+                client.get_usage_metrics_batch(metrics),
+                client.get_service_insights(self.config.get('audit_services', ['EC2', 'S3', 'RDS']))
+            )
+        
         results = {
-            'cost_analysis': self.run_cost_analysis(),
-            'usage_monitoring': self.run_usage_monitoring(),
-            'service_audit': self.run_service_audit()
+            'cost_analysis': cost,
+            'usage_monitoring': self._usage_results(usage, metrics),
+            'service_audit': audit
         }
-        return results
\ No newline at end of file
+        for operation, result in results.items():
+            self._store_result(operation, result)
+        return results
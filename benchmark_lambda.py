@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Replay a batch of API Gateway events through lambda_handler locally.
+
+AWS calls are answered by a local Cost Explorer stand-in (via AWS_ENDPOINT_URL),
+so the numbers reflect handler, session and client overhead rather than AWS.
+
+    python benchmark_lambda.py --events 200
+    python benchmark_lambda.py --events-file events.json --mode cold
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE_FILE = 'mcp_results_cost_analysis.json'
+
+def _load_cost_rows() -> list:
+    """Recorded ResultsByTime rows used as the stand-in response"""
+    try:
+        with open(FIXTURE_FILE, 'r') as f:
+            return json.load(f)['result']['result']['cost_data']
+    except (OSError, KeyError, ValueError):
+        return []
+
+class _CostExplorerStandIn(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    payload = b'{}'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-amz-json-1.1')
+        self.send_header('Content-Length', str(len(self.payload)))
+        self.end_headers()
+        self.wfile.write(self.payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stand_in() -> ThreadingHTTPServer:
+    """Serve canned GetCostAndUsage responses on a random local port"""
+    _CostExplorerStandIn.payload = json.dumps({'ResultsByTime': _load_cost_rows()}).encode()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _CostExplorerStandIn)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    os.environ['AWS_ENDPOINT_URL'] = f'http://127.0.0.1:{httpd.server_address[1]}'
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    return httpd
+
+def build_events(count: int, events_file: str = None, use_cache: bool = True) -> list:
+    """Load events from a file or synthesize get_cost_data requests"""
+    if events_file:
+        with open(events_file, 'r') as f:
+            events = json.load(f)
+        return [events[i % len(events)] for i in range(count)]
+    body = json.dumps({'method': 'get_cost_data', 'params': {'days': 30, 'cache': use_cache}})
+    return [{'body': body} for _ in range(count)]
+
+def replay(events: list, cold: bool) -> dict:
+    """Run every event through the handler and collect latency figures"""
+    import lambda_handler
+
+    lambda_handler.reset_server()
+    latencies = []
+    cold_flags = 0
+    for event in events:
+        if cold:
+            lambda_handler.reset_server()
+        started = time.perf_counter()
+        response = lambda_handler.lambda_handler(event, None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if json.loads(response['body']).get('_meta', {}).get('cold_start'):
+            cold_flags += 1
+
+    latencies.sort()
+    return {
+        'mode': 'cold' if cold else 'warm',
+        'events': len(events),
+        'cold_starts': cold_flags,
+        'total_s': round(sum(latencies) / 1000, 3),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'p50_ms': round(latencies[len(latencies) // 2], 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark lambda_handler warm vs cold invocations')
+    parser.add_argument('--events', type=int, default=100, help='number of events to replay')
+    parser.add_argument('--events-file', help='JSON list of API Gateway events to replay')
+    parser.add_argument('--mode', choices=['warm', 'cold', 'both'], default='both')
+    parser.add_argument('--no-cache', action='store_true', help='bypass the cost response cache')
+    args = parser.parse_args()
+
+    httpd = start_stand_in()
+    events = build_events(args.events, args.events_file, use_cache=not args.no_cache)
+    modes = ['cold', 'warm'] if args.mode == 'both' else [args.mode]
+
+    print("Lambda Handler Benchmark:")
+    for mode in modes:
+        report = replay(events, cold=(mode == 'cold'))
+        print(f"\n{mode.upper()}:")
+        for key, value in report.items():
+            print(f"  {key}: {value}")
+
+    httpd.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Offline benchmark suite for the server, Lambda handler, client and framework.
+
+Cost Explorer, CloudWatch, EC2 and Bedrock are stubbed at botocore's
+before-call hook. Their fixtures are scaled up from the recorded results
+(mcp_results_*.json), so no AWS account or network is needed. The stubs
+answer after the throttling and instrumentation hooks, so those are
+measured too; only HTTP and response parsing are skipped. Each scenario
+reports throughput, latency percentiles and peak traced memory. Results
+can be saved and compared against an earlier run.
+
+    python benchmark_suite.py --services 100 --days 365 --instances 10000
+    python benchmark_suite.py --save benchmark_results/base.json
+    python benchmark_suite.py --baseline benchmark_results/base.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from botocore.awsrequest import AWSResponse
+from botocore.response import StreamingBody
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import lambda_handler
+from mcp_server import MCPServer
+from mcp_client import MCPClient
+from local_server import LocalMCPServer
+from automation_framework import MCPAutomationFramework
+from throttling import configure_service
+
+COST_FIXTURE_FILE = 'mcp_results_cost_analysis.json'
+# Days of ResultsByTime per stubbed Cost Explorer page
+COST_PAGE_DAYS = 60
+# Reservations per stubbed DescribeInstances page
+EC2_PAGE_SIZE = 200
+INSTANCE_TYPES = ['t3.micro', 't3.medium', 'm5.large', 'm5.xlarge', 'c5.2xlarge', 'r5.large']
+
+def _recorded_service_amounts() -> dict:
+    """Mean daily amount per service in the recorded cost fixture"""
+    try:
+        with open(COST_FIXTURE_FILE, 'r') as f:
+            rows = json.load(f)['result']['result']['cost_data']
+    except (OSError, KeyError, ValueError):
+        return {}
+    totals = {}
+    for row in rows:
+        for group in row.get('Groups', []):
+            amount = float(group['Metrics']['BlendedCost']['Amount'])
+            totals.setdefault(group['Keys'][0], []).append(amount)
+    return {name: statistics.mean(amounts) for name, amounts in totals.items()}
+
+class StubbedAWS:
+    """Scaled fixtures plus botocore hooks that answer from them.
+
+    Install on an MCPServer before its clients are created; clients copy the
+    session's hooks when they are built.
+    """
+
+    def __init__(self, services: int = 100, days: int = 365, instances: int = 10000, seed: int = 7):
+        rng = random.Random(seed)
+        recorded = _recorded_service_amounts()
+        names = sorted(recorded)[:services]
+        names += [f'Synthetic Service {index:03d}' for index in range(len(names), services)]
+        base = {name: recorded.get(name, rng.uniform(0.01, 50.0)) for name in names}
+
+        end = date.today() + timedelta(days=1)
+        self.cost_rows = {}
+        for offset in range(days, 0, -1):
+            day = end - timedelta(days=offset)
+            self.cost_rows[day.isoformat()] = {
+                'TimePeriod': {'Start': day.isoformat(), 'End': (day + timedelta(days=1)).isoformat()},
+                'Total': {},
+                'Groups': [
+                    {'Keys': [name], 'Metrics': {'BlendedCost': {
+                        'Amount': f'{base[name] * rng.uniform(0.8, 1.2):.10f}', 'Unit': 'USD'}}}
+                    for name in names
+                ],
+                'Estimated': day >= date.today()
+            }
+
+        launched = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.reservations = []
+        for index in range(0, instances, 5):
+            self.reservations.append({'ReservationId': f'r-{index:017x}', 'Instances': [
+                {
+                    'InstanceId': f'i-{number:017x}',
+                    'InstanceType': rng.choice(INSTANCE_TYPES),
+                    'State': {'Name': 'running' if rng.random() < 0.85 else 'stopped'},
+                    'LaunchTime': launched
+                }
+                for number in range(index, min(index + 5, instances))
+            ]})
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def install(self, server: MCPServer):
+        events = server.session.events
+        events.register('before-parameter-build', self._remember_params)
+        # Last, so the throttling and instrumentation hooks still run
+        events.register_last('before-call', self._answer)
+        for service in ('ce', 'cloudwatch', 'ec2', 'bedrock-runtime'):
+            configure_service(service, 1e6)
+
+    @staticmethod
+    def _remember_params(params=None, context=None, **kwargs):
+        if context is not None:
+            context['benchmark_params'] = dict(params or {})
+
+    def _answer(self, model=None, context=None, **kwargs):
+        handler = getattr(self, f'_{model.service_model.service_name}_{model.name}'.replace('-', '_'), None)
+        if handler is None:
+            return None
+        with self._lock:
+            self.calls[model.name] = self.calls.get(model.name, 0) + 1
+        parsed = handler((context or {}).get('benchmark_params', {}))
+        return AWSResponse('https://stub.local', 200, {}, None), parsed
+
+    def _ce_GetCostAndUsage(self, params):
+        start = params['TimePeriod']['Start']
+        end = params['TimePeriod']['End']
+        days = [row for day, row in self.cost_rows.items() if start <= day < end]
+        offset = int(params.get('NextPageToken') or 0)
+        page = [dict(row, Groups=list(row['Groups'])) for row in days[offset:offset + COST_PAGE_DAYS]]
+        response = {'ResultsByTime': page}
+        if offset + COST_PAGE_DAYS < len(days):
+            response['NextPageToken'] = str(offset + COST_PAGE_DAYS)
+        return response
+
+    def _cloudwatch_GetMetricStatistics(self, params):
+        start = params['StartTime']
+        return {'Label': params['MetricName'], 'Datapoints': [
+            {'Timestamp': start + timedelta(hours=hour), 'Average': 20.0 + hour % 7, 'Unit': 'Percent'}
+            for hour in range(24)
+        ]}
+
+    def _cloudwatch_GetMetricData(self, params):
+        start = params['StartTime']
+        span = (params['EndTime'] - start).total_seconds()
+        results = []
+        for index, query in enumerate(params['MetricDataQueries']):
+            period = query['MetricStat']['Period']
+            points = max(1, int(span // period))
+            results.append({
+                'Id': query['Id'],
+                'Label': query['Id'],
+                'Timestamps': [start + timedelta(seconds=period * point) for point in range(points)],
+                'Values': [float((index + point) % 100) for point in range(points)],
+                'StatusCode': 'Complete'
+            })
+        return {'MetricDataResults': results}
+
+    def _ec2_DescribeInstances(self, params):
+        offset = int(params.get('NextToken') or 0)
+        states = next((f['Values'] for f in params.get('Filters', []) if f['Name'] == 'instance-state-name'), None)
+        reservations = [
+            dict(reservation, Instances=[i for i in reservation['Instances'] if states is None or i['State']['Name'] in states])
+            for reservation in self.reservations[offset:offset + EC2_PAGE_SIZE]
+        ]
+        response = {'Reservations': reservations}
+        if offset + EC2_PAGE_SIZE < len(self.reservations):
+            response['NextToken'] = str(offset + EC2_PAGE_SIZE)
+        return response
+
+    def _bedrock_runtime_InvokeModel(self, params):
+        payload = json.dumps({
+            'inputTextTokenCount': 1800,
+            'results': [{
+                'tokenCount': 120,
+                'outputText': 'Top spend is EC2 compute. Rightsize idle instances, buy Savings Plans '
+                              'for steady usage and move infrequently read S3 data to cheaper tiers.',
+                'completionReason': 'FINISH'
+            }]
+        }).encode()
+        return {'body': StreamingBody(io.BytesIO(payload), len(payload)), 'contentType': 'application/json'}
+
+def _check(response):
+    """Raise if a scenario's response reports an error"""
+    if isinstance(response, dict) and 'statusCode' in response:
+        if response['statusCode'] != 200:
+            raise RuntimeError(response['body'][:200])
+        response = json.loads(response['body'])
+    if isinstance(response, dict) and 'error' in response:
+        raise RuntimeError(str(response['error'])[:200])
+    return response
+
+def measure(name: str, fn, iterations: int, warmup: int = 1) -> dict:
+    """Time ``iterations`` calls, then trace one more for peak memory"""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    errors = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            errors.append(str(e))
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        fn()
+    except Exception:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+
+    def percentile(q):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))], 3)
+
+    report = {
+        'scenario': name,
+        'iterations': iterations,
+        'errors': len(errors),
+        'throughput_per_s': round(iterations / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'p50_ms': percentile(0.5),
+        'p90_ms': percentile(0.9),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(latencies[-1], 3),
+        'peak_memory_kb': round(peak / 1024, 1)
+    }
+    if errors:
+        report['first_error'] = errors[0]
+    return report
+
+class _LambdaStandIn(BaseHTTPRequestHandler):
+    """API Gateway stand-in: passes POST bodies to lambda_handler"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        event = {'body': body.decode('latin-1'), 'headers': dict(self.headers)}
+        if self.headers.get('Content-Encoding') == 'gzip':
+            event = dict(event, body=base64.b64encode(body).decode(), isBase64Encoded=True)
+        response = lambda_handler.lambda_handler(event, None)
+        payload = response['body'].encode()
+        self.send_response(response['statusCode'])
+        for header, value in response.get('headers', {}).items():
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def build_scenarios(stubs: StubbedAWS, args, server_url: str, local_url: str, config_file: str) -> list:
+    """(name, callable) pairs in run order"""
+    server = MCPServer()
+    stubs.install(server)
+    lambda_server = lambda_handler.get_server()
+    stubs.install(lambda_server)
+
+    cost_params = {'days': args.days, 'cache': False}
+    metric_queries = [
+        {'service': 'AWS/EC2', 'metric': 'CPUUtilization', 'dimensions': {'InstanceId': f'i-{index:017x}'}}
+        for index in range(args.metric_queries)
+    ]
+    ai_data = {'cost_data': list(stubs.cost_rows.values())[-30:]}
+    client = MCPClient(server_url)
+    local_client = MCPClient(local_url)
+    framework = MCPAutomationFramework(config_file)
+
+    def request(method, params):
+        return lambda: _check(server.handle_request({'method': method, 'params': params}))
+
+    def lambda_call(method, params):
+        body = json.dumps({'method': method, 'params': params})
+        return lambda: _check(lambda_handler.lambda_handler({'body': body}, None))
+
+    def lambda_cold():
+        lambda_handler.reset_server()
+        stubs.install(lambda_handler.get_server())
+        _check(lambda_handler.lambda_handler({'body': json.dumps({'method': 'get_cost_data',
+                                                                  'params': {'days': 30}})}, None))
+
+    def run_once():
+        results = framework.run_once()
+        for result in results.values():
+            for entry in result if isinstance(result, list) else [result]:
+                _check(entry)
+
+    return [
+        (f'server.get_cost_data[{args.days}d]', request('get_cost_data', cost_params)),
+        (f'server.get_cost_data[{args.days}d,compact]', request('get_cost_data', dict(cost_params, format='compact', rollups=['totals']))),
+        (f'server.get_cost_anomalies[{args.days}d]', request('get_cost_anomalies', {'days': args.days, 'lookback_days': 7})),
+        (f'server.get_cost_forecast[{args.days}d]', request('get_cost_forecast', {'days': args.days})),
+        (f'server.get_usage_metrics_batch[{args.metric_queries}]', request('get_usage_metrics_batch', {'queries': metric_queries})),
+        (f'server.get_service_insights[EC2,{args.instances}]', request('get_service_insights', {'services': ['EC2']})),
+        (f'server.get_rightsizing_candidates[{args.instances}]', request('get_rightsizing_candidates', {})),
+        ('server.get_ai_analysis[30d]', request('get_ai_analysis', {'data': ai_data, 'cache': False})),
+        (f'lambda_handler.get_cost_data[{args.days}d,warm]', lambda_call('get_cost_data', cost_params)),
+        ('lambda_handler.get_cost_data[30d,cold]', lambda_cold),
+        ('client.get_cost_analysis[30d,http]', lambda: _check(client.get_cost_analysis(30))),
+        ('local_server.get_cost_analysis[30d,http]', lambda: _check(local_client.get_cost_analysis(30))),
+        ('framework.run_once', run_once)
+    ]
+
+def compare(results: list, baseline_file: str, tolerance: float) -> list:
+    """Scenarios whose p50 latency or peak memory grew by more than ``tolerance``"""
+    with open(baseline_file, 'r') as f:
+        baseline = {entry['scenario']: entry for entry in json.load(f)['results']}
+
+    regressions = []
+    print(f"\nComparison with {baseline_file}:")
+    for result in results:
+        previous = baseline.get(result['scenario'])
+        if previous is None:
+            print(f"  {result['scenario']}: no baseline")
+            continue
+        changes = {}
+        for field in ('p50_ms', 'throughput_per_s', 'peak_memory_kb'):
+            if previous[field]:
+                changes[field] = (result[field] - previous[field]) / previous[field]
+        print(f"  {result['scenario']}: " + ', '.join(f'{field} {change:+.1%}' for field, change in changes.items()))
+        if changes.get('p50_ms', 0) > tolerance or changes.get('peak_memory_kb', 0) > tolerance:
+            regressions.append(result['scenario'])
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks against stubbed AWS backends')
+    parser.add_argument('--services', type=int, default=100, help='services in the cost fixture')
+    parser.add_argument('--days', type=int, default=365, help='days in the cost fixture')
+    parser.add_argument('--instances', type=int, default=10000, help='EC2 instances in the fixture')
+    parser.add_argument('--metric-queries', type=int, default=1000, help='queries per usage metrics batch')
+    parser.add_argument('--iterations', type=int, default=20, help='timed calls per scenario')
+    parser.add_argument('--only', help='run scenarios whose name contains this text')
+    parser.add_argument('--save', help='write results as JSON for later comparison')
+    parser.add_argument('--baseline', help='compare against results saved with --save')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    stubs = StubbedAWS(args.services, args.days, args.instances)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _LambdaStandIn)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    server_url = f'http://127.0.0.1:{httpd.server_address[1]}'
+    # The long-running server around the same (stubbed) MCPServer the Lambda uses
+    local = LocalMCPServer(lambda_handler.get_server())
+    threading.Thread(target=lambda: asyncio.run(local.serve_http('127.0.0.1', 0)), daemon=True).start()
+    local.ready.wait(10)
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json'), 'r') as f:
+        config = json.load(f)
+    config.update({'server_url': server_url, 'log_results': False, 'audit_services': ['EC2']})
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(config, f)
+        config_file = f.name
+
+    print("Benchmark Suite:")
+    print(f"  fixtures: {args.services} services x {args.days} days, {args.instances} instances")
+    results = []
+    try:
+        for name, fn in build_scenarios(stubs, args, server_url, local.url, config_file):
+            if args.only and args.only not in name:
+                continue
+            result = measure(name, fn, args.iterations)
+            results.append(result)
+            print(f"\n{name}:")
+            for key, value in result.items():
+                if key != 'scenario':
+                    print(f"  {key}: {value}")
+    finally:
+        httpd.shutdown()
+        local.stop()
+        os.remove(config_file)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'parameters': {key: value for key, value in vars(args).items() if key not in ('save', 'baseline')},
+                'results': results
+            }, f, indent=2)
+        print(f"\nResults saved to {args.save}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, NamedTuple, Tuple
+import numpy as np
+from cost_format import cost_unit
+
+# Trailing days each day is compared against
+ANOMALY_WINDOW_DAYS = 14
+ANOMALY_Z_THRESHOLD = 3.0
+# Spikes smaller than this (in the cost unit) are not worth reporting
+ANOMALY_MIN_DELTA = 1.0
+# Floor for the trailing standard deviation, so a flat series that moves by a
+# cent does not score an infinite z
+MIN_STD = 0.01
+SEASONAL_PERIOD_DAYS = 7
+FORECAST_HORIZON_DAYS = 14
+# Two-sided ~95% interval for normally distributed residuals
+INTERVAL_Z = 1.96
+
+class CostFrame(NamedTuple):
+    """Cost data as a day x service array"""
+    days: List[str]
+    services: List[str]
+    costs: np.ndarray
+    unit: str
+
+def cost_frame(rows: List[Dict], metric: str = 'BlendedCost') -> CostFrame:
+    """CostFrame from ResultsByTime rows.
+
+    Same layout as cost_format.cost_matrix (services by total cost, highest
+    first), but the amounts are parsed and summed by NumPy in one pass
+    instead of cell by cell. Walking the row dicts is still most of the
+    cost, so callers that reuse rows should reuse the frame too.
+    """
+    days = [row['TimePeriod']['Start'] for row in rows]
+    groups = [row.get('Groups') or [] for row in rows]
+    names = [' | '.join(group.get('Keys', [])) or 'Unknown' for day_groups in groups for group in day_groups]
+    amounts = [group['Metrics'][metric]['Amount'] for day_groups in groups for group in day_groups]
+    day_index = [d for d, day_groups in enumerate(groups) for _ in day_groups]
+    for d, row in enumerate(rows):
+        if not groups[d] and metric in row.get('Total', {}):
+            # Ungrouped queries only carry the period total
+            names.append('Total')
+            amounts.append(row['Total'][metric]['Amount'])
+            day_index.append(d)
+
+    index = {}
+    service_index = [index.setdefault(name, len(index)) for name in names]
+    costs = np.zeros((len(days), len(index)))
+    np.add.at(costs, (np.array(day_index, dtype=int), np.array(service_index, dtype=int)),
+              np.array(amounts, dtype=float))
+
+    names = list(index)
+    totals = costs.sum(axis=0)
+    order = sorted(range(len(names)), key=lambda s: (-totals[s], names[s]))
+    return CostFrame(days, [names[s] for s in order], costs[:, order], cost_unit(rows))
+
+def rolling_zscores(costs: np.ndarray, window: int = ANOMALY_WINDOW_DAYS) -> Tuple[np.ndarray, np.ndarray]:
+    """z-score of every day against the ``window`` days before it, for all services at once.
+
+    Returns (z, expected) with the trailing means as the expectation; both
+    are NaN for the first ``window`` days.
+    """
+    if window < 2:
+        raise ValueError('The anomaly window needs at least two days')
+    z = np.full(costs.shape, np.nan)
+    expected = np.full(costs.shape, np.nan)
+    if costs.shape[0] <= window:
+        return z, expected
+    # Window sums from prefix sums: O(days x services) whatever the window.
+    # Centering first keeps the sum of squares from losing precision.
+    offset = costs.mean(axis=0)
+    centered = costs - offset
+    padding = np.zeros((1, costs.shape[1]))
+    sums = np.cumsum(np.vstack([padding, centered]), axis=0)
+    squares = np.cumsum(np.vstack([padding, centered ** 2]), axis=0)
+    window_sum = sums[window:-1] - sums[:-window - 1]
+    window_squares = squares[window:-1] - squares[:-window - 1]
+    mean = window_sum / window
+    variance = np.maximum(window_squares - window_sum * mean, 0.0) / (window - 1)
+    std = np.maximum(np.sqrt(variance), MIN_STD)
+    expected[window:] = mean + offset
+    z[window:] = (centered[window:] - mean) / std
+    return z, expected
+
+def week_over_week(costs: np.ndarray, period: int = SEASONAL_PERIOD_DAYS) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-service totals of the last ``period`` days and of the ``period`` days before"""
+    if costs.shape[0] < 2 * period:
+        return np.zeros(costs.shape[1]), np.zeros(costs.shape[1])
+    return costs[-period:].sum(axis=0), costs[-2 * period:-period].sum(axis=0)
+
+def detect_anomalies(frame: CostFrame, window: int = ANOMALY_WINDOW_DAYS, threshold: float = ANOMALY_Z_THRESHOLD,
+                     lookback_days: int = 1, min_delta: float = ANOMALY_MIN_DELTA, top_n: int = 10) -> Dict[str, Any]:
+    """Service/day cells of the last ``lookback_days`` days whose cost is more
+    than ``threshold`` trailing standard deviations from the trailing mean,
+    plus the largest week-over-week changes"""
+    days, services, costs, unit = frame
+    z, expected = rolling_zscores(costs, window)
+
+    recent = slice(max(len(days) - lookback_days, 0), len(days))
+    with np.errstate(invalid='ignore'):
+        flagged = (np.abs(z[recent]) >= threshold) & (np.abs(costs[recent] - expected[recent]) >= min_delta)
+    day_index, service_index = np.nonzero(flagged)
+    day_index += recent.start
+    anomalies = [
+        {
+            'day': days[d],
+            'service': services[s],
+            'amount': round(float(costs[d, s]), 4),
+            'expected': round(float(expected[d, s]), 4),
+            'delta': round(float(costs[d, s] - expected[d, s]), 4),
+            'z_score': round(float(z[d, s]), 2)
+        }
+        for d, s in zip(day_index, service_index)
+    ]
+    anomalies.sort(key=lambda anomaly: -abs(anomaly['delta']))
+
+    this_week, last_week = week_over_week(costs)
+    change = this_week - last_week
+    week_changes = [
+        {
+            'service': services[s],
+            'this_week': round(float(this_week[s]), 4),
+            'last_week': round(float(last_week[s]), 4),
+            'delta': round(float(change[s]), 4),
+            'change_pct': round(float(change[s] / last_week[s] * 100), 2) if last_week[s] else None
+        }
+        for s in np.argsort(-np.abs(change))[:top_n] if change[s]
+    ]
+
+    return {
+        'unit': unit,
+        'days_analyzed': len(days),
+        'services_analyzed': len(services),
+        'window_days': window,
+        'threshold': threshold,
+        'anomalies': anomalies[:top_n] if top_n else anomalies,
+        'anomaly_count': len(anomalies),
+        'week_over_week': week_changes
+    }
+
+def _linear_fit(costs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Least-squares (intercept, slope) per service over day indexes 0..n-1"""
+    t = np.arange(costs.shape[0], dtype=float)
+    centered = t - t.mean()
+    denominator = centered @ centered
+    # Zero only for a single day, which has no trend
+    slope = centered @ (costs - costs.mean(axis=0)) / denominator if denominator else np.zeros(costs.shape[1])
+    return costs.mean(axis=0) - slope * t.mean(), slope
+
+def forecast_costs(frame: CostFrame, horizon: int = FORECAST_HORIZON_DAYS, method: str = 'seasonal',
+                   period: int = SEASONAL_PERIOD_DAYS, top_n: int = 10) -> Dict[str, Any]:
+    """Forecast the next ``horizon`` days for every service at once.
+
+    ``linear`` extrapolates a least-squares trend. ``seasonal`` adds the mean
+    residual for each day of the ``period`` (weekday effects); it needs two
+    full periods of history and falls back to ``linear`` otherwise. The
+    interval comes from the spread of the in-sample residuals.
+    """
+    days, services, costs, unit = frame
+    n = costs.shape[0]
+    if n < 2:
+        raise ValueError('At least two days of cost data are needed for a forecast')
+    if method not in ('linear', 'seasonal'):
+        raise ValueError(f'Unknown forecast method: {method}')
+    if method == 'seasonal' and n < 2 * period:
+        method = 'linear'
+
+    intercept, slope = _linear_fit(costs)
+    t = np.arange(n + horizon, dtype=float)[:, None]
+    fitted = intercept + slope * t
+    if method == 'seasonal':
+        residuals = costs - fitted[:n]
+        phase = np.arange(n) % period
+        seasonal = np.stack([residuals[phase == p].mean(axis=0) for p in range(period)])
+        fitted = fitted + seasonal[np.arange(n + horizon) % period]
+
+    # Residual spread of the daily total, which is what the interval is reported for
+    total_error = (costs - fitted[:n]).sum(axis=1).std(ddof=1) if n > 2 else 0.0
+    future = np.maximum(fitted[n:], 0.0)
+    daily_total = future.sum(axis=1)
+    service_totals = future.sum(axis=0)
+    margin = INTERVAL_Z * total_error * np.sqrt(horizon)
+
+    last_day = date.fromisoformat(days[-1][:10])
+    return {
+        'unit': unit,
+        'method': method,
+        'history_days': n,
+        'horizon_days': horizon,
+        'days': [str(last_day + timedelta(days=offset)) for offset in range(1, horizon + 1)],
+        'daily_total': [round(float(amount), 4) for amount in daily_total],
+        'total': round(float(daily_total.sum()), 4),
+        'total_lower': round(max(float(daily_total.sum() - margin), 0.0), 4),
+        'total_upper': round(float(daily_total.sum() + margin), 4),
+        'services': [
+            {
+                'service': services[s],
+                'forecast_total': round(float(service_totals[s]), 4),
+                'trend_per_day': round(float(slope[s]), 4)
+            }
+            for s in np.argsort(-service_totals)[:top_n]
+        ]
+    }
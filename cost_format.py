@@ -0,0 +1,89 @@
+from typing import Dict, List, Tuple
+
+COMPACT_ROLLUPS = ('totals', 'deltas')
+
+def _group_amounts(row: Dict, metric: str = 'BlendedCost') -> Dict[str, float]:
+    """{service: amount} for one ResultsByTime row"""
+    amounts = {}
+    for group in row.get('Groups', []):
+        name = ' | '.join(group.get('Keys', [])) or 'Unknown'
+        amounts[name] = amounts.get(name, 0.0) + float(group['Metrics'][metric]['Amount'])
+    if not row.get('Groups') and metric in row.get('Total', {}):
+        # Ungrouped queries only carry the period total
+        amounts['Total'] = float(row['Total'][metric]['Amount'])
+    return amounts
+
+def cost_matrix(rows: List[Dict], metric: str = 'BlendedCost') -> Tuple[List[str], List[str], List[List[float]]]:
+    """Dense day x service matrix from ResultsByTime rows.
+
+    Services are ordered by total cost, highest first.
+    """
+    days = [row['TimePeriod']['Start'] for row in rows]
+    per_day = [_group_amounts(row, metric) for row in rows]
+
+    totals = {}
+    for amounts in per_day:
+        for service, amount in amounts.items():
+            totals[service] = totals.get(service, 0.0) + amount
+    services = sorted(totals, key=lambda service: (-totals[service], service))
+
+    matrix = [[amounts.get(service, 0.0) for service in services] for amounts in per_day]
+    return days, services, matrix
+
+def cost_unit(rows: List[Dict], metric: str = 'BlendedCost') -> str:
+    for row in rows:
+        for group in row.get('Groups', []):
+            return group['Metrics'][metric].get('Unit', 'USD')
+    return 'USD'
+
+def compact_cost_rows(rows: List[Dict], top_n: int = None, rollups: List[str] = None,
+                      precision: int = 4) -> Dict:
+    """Encode ResultsByTime rows as a service dictionary plus sparse columnar values.
+
+    ``values`` holds three parallel arrays (day index, service index, amount)
+    containing only the non-zero cells. ``top_n`` keeps the N most expensive
+    services and folds the rest into "Other". ``rollups`` may request
+    'totals' (per-service and per-day totals) and 'deltas' (day-over-day
+    change of the daily total).
+    """
+    days, services, matrix = cost_matrix(rows)
+
+    if top_n is not None and len(services) > top_n:
+        services = services[:top_n] + ['Other']
+        matrix = [values[:top_n] + [sum(values[top_n:])] for values in matrix]
+
+    day_index, service_index, amounts = [], [], []
+    for d, values in enumerate(matrix):
+        for s, amount in enumerate(values):
+            amount = round(amount, precision)
+            if amount:
+                day_index.append(d)
+                service_index.append(s)
+                amounts.append(amount)
+
+    compact = {
+        'unit': cost_unit(rows),
+        'days': days,
+        'services': services,
+        'values': {'day': day_index, 'service': service_index, 'amount': amounts}
+    }
+
+    rollups = rollups or []
+    daily_totals = [round(sum(values), precision) for values in matrix]
+    if 'totals' in rollups:
+        compact['service_totals'] = [round(sum(column), precision) for column in zip(*matrix)] if matrix else []
+        compact['daily_totals'] = daily_totals
+        compact['total'] = round(sum(daily_totals), precision)
+    if 'deltas' in rollups:
+        compact['day_over_day'] = [None] + [
+            round(today - yesterday, precision) for yesterday, today in zip(daily_totals, daily_totals[1:])
+        ] if daily_totals else []
+    return compact
+
+def expand_compact(compact: Dict) -> List[Dict]:
+    """Rebuild {day: {service: amount}} records from a compact payload"""
+    records = [{'day': day, 'costs': {}} for day in compact['days']]
+    values = compact['values']
+    for d, s, amount in zip(values['day'], values['service'], values['amount']):
+        records[d]['costs'][compact['services'][s]] = amount
+    return records
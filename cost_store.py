@@ -0,0 +1,107 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+class SQLiteCostStore:
+    """Day-partitioned store of Cost Explorer ResultsByTime rows.
+
+    Rows are keyed on (dimension, day) where dimension is the group-by
+    signature, so a rolling window only needs the days it has not seen yet.
+    A day with a NULL row was fetched but Cost Explorer returned nothing.
+    Rows Cost Explorer marks ``Estimated`` are still being revised, so they
+    are stored but count as missing until a final row replaces them.
+    """
+
+    def __init__(self, path: str = 'mcp_cost_store.sqlite3'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cost_rows ('
+            ' dimension TEXT NOT NULL,'
+            ' day TEXT NOT NULL,'
+            ' row TEXT,'
+            ' fetched_at REAL NOT NULL,'
+            ' estimated INTEGER NOT NULL DEFAULT 0,'
+            ' PRIMARY KEY (dimension, day))'
+        )
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(cost_rows)')}
+        if 'estimated' not in columns:
+            # Stores created before estimates were tracked: flag the rows that were estimates
+            self._conn.execute('ALTER TABLE cost_rows ADD COLUMN estimated INTEGER NOT NULL DEFAULT 0')
+            self._conn.execute('UPDATE cost_rows SET estimated = 1 WHERE row LIKE \'%"Estimated": true%\'')
+        self._conn.commit()
+
+    def covered_days(self, dimension: str, start: date, end: date) -> set:
+        """Days in [start, end) that are stored with final (not estimated) costs"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT day FROM cost_rows WHERE dimension = ? AND day >= ? AND day < ? AND NOT estimated',
+                (dimension, start.isoformat(), end.isoformat())
+            )
+            return {row[0] for row in cursor}
+
+    def missing_ranges(self, dimension: str, start: date, end: date) -> List[Tuple[date, date]]:
+        """Contiguous [start, end) ranges within the window that are not stored"""
+        covered = self.covered_days(dimension, start, end)
+        ranges = []
+        range_start = None
+        day = start
+        while day < end:
+            if day.isoformat() in covered:
+                if range_start is not None:
+                    ranges.append((range_start, day))
+                    range_start = None
+            elif range_start is None:
+                range_start = day
+            day += timedelta(days=1)
+        if range_start is not None:
+            ranges.append((range_start, end))
+        return ranges
+
+    def put_rows(self, dimension: str, start: date, end: date, rows: List[Dict]):
+        """Store rows for [start, end), marking days without a row as fetched"""
+        by_day = {row['TimePeriod']['Start']: row for row in rows}
+        now = time.time()
+        records = []
+        day = start
+        while day < end:
+            row = by_day.get(day.isoformat())
+            records.append((dimension, day.isoformat(), json.dumps(row) if row is not None else None, now,
+                            int(bool(row and row.get('Estimated')))))
+            day += timedelta(days=1)
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO cost_rows (dimension, day, row, fetched_at, estimated) VALUES (?, ?, ?, ?, ?)',
+                records
+            )
+            self._conn.commit()
+
+    def get_rows(self, dimension: str, start: date, end: date) -> List[Dict]:
+        """Stored rows for [start, end) in day order"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT row FROM cost_rows WHERE dimension = ? AND day >= ? AND day < ? AND row IS NOT NULL'
+                ' ORDER BY day',
+                (dimension, start.isoformat(), end.isoformat())
+            )
+            return [json.loads(row[0]) for row in cursor]
+
+    def prune(self, before: date, dimension: Optional[str] = None) -> int:
+        """Delete days older than ``before``; returns the number of rows removed"""
+        query = 'DELETE FROM cost_rows WHERE day < ?'
+        args = [before.isoformat()]
+        if dimension is not None:
+            query += ' AND dimension = ?'
+            args.append(dimension)
+        with self._lock:
+            cursor = self._conn.execute(query, args)
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -8,7 +8,9 @@ def create_api_gateway():
     # Create API Gateway
     api = apigateway.create_rest_api(
         name='mcp-api',
-        description='MCP Server API'
+        description='MCP Server API',
+        # Lets API Gateway gzip responses (and accept gzip requests) above 1 KB
+        minimumCompressionSize=1024
     )
     api_id = api['id']
     
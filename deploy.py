@@ -1,22 +1,85 @@
+import argparse
+import base64
+import importlib.util
+import json
+import os
+import py_compile
+import re
+import statistics
+import sys
+import tempfile
 import boto3
 import zipfile
 import time
 
-def deploy_lambda():
+# Modules shipped in the deployment package
+PACKAGE_MODULES = [
+    'lambda_handler.py',
+    'mcp_server.py',
+    'response_cache.py',
+    'cost_store.py',
+    'service_collectors.py',
+    'cost_format.py',
+    'prompt_builder.py',
+    'single_flight.py',
+    'throttling.py',
+    'instrumentation.py',
+    'fleet.py',
+    'cost_analytics.py',
+    'rightsizing.py'
+]
+
+FUNCTION_NAME = 'mcp-server'
+RUNTIME = 'python3.10'
+# Lambda duration price per GB-second (us-east-1) by architecture, plus the per-request charge
+PRICE_PER_GB_SECOND = {'x86_64': 0.0000166667, 'arm64': 0.0000133334}
+PRICE_PER_REQUEST = 0.0000002
+
+def build_package(zip_file_name: str = 'mcp-server.zip', runtime: str = RUNTIME, precompile: bool = False) -> bytes:
+    """Zip PACKAGE_MODULES; with ``precompile`` their bytecode is shipped too.
+
+    /var/task is read-only, so Lambda cannot cache the bytecode it compiles
+    and recompiles every module on each cold start. Bytecode only loads on
+    the Python version that wrote it, so precompilation is skipped unless the
+    local interpreter matches ``runtime``.
+    """
+    local = f'python{sys.version_info.major}.{sys.version_info.minor}'
+    if precompile and local != runtime:
+        print(f"Skipping bytecode precompilation: local {local} does not match runtime {runtime}")
+        precompile = False
+
+    with tempfile.TemporaryDirectory() as build_dir, zipfile.ZipFile(zip_file_name, 'w', zipfile.ZIP_DEFLATED) as z:
+        for module in PACKAGE_MODULES:
+            z.write(module)
+            if precompile:
+                # Unchecked: the package is immutable, so skip the source stat/hash on import
+                compiled = os.path.join(build_dir, os.path.basename(module) + 'c')
+                py_compile.compile(module, cfile=compiled, doraise=True,
+                                   invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+                z.write(compiled, importlib.util.cache_from_source(module))
+
+    with open(zip_file_name, 'rb') as f:
+        return f.read()
+
+def _merged_environment(lambda_client, function_name: str, updates: dict) -> dict:
+    """The function's environment variables with ``updates`` applied (others are kept)"""
+    current = lambda_client.get_function_configuration(FunctionName=function_name)
+    variables = dict(current.get('Environment', {}).get('Variables', {}))
+    variables.update(updates)
+    return {'Variables': variables}
+
+def deploy_lambda(memory_size: int = 256, architecture: str = 'x86_64', precompile: bool = False,
+                  prewarm_clients: list = None, timeout: int = 30):
     lambda_client = boto3.client('lambda')
-    function_name = 'mcp-server'
+    function_name = FUNCTION_NAME
     handler_name = 'lambda_handler.lambda_handler'
     role_arn = 'arn:aws:iam::411335221056:role/mcp-lambda-role'
-    runtime = 'python3.10'
+    runtime = RUNTIME
+    environment = {'MCP_PREWARM_CLIENTS': ','.join(prewarm_clients)} if prewarm_clients is not None else {}
 
     # Create deployment package
-    zip_file_name = 'mcp-server.zip'
-    with zipfile.ZipFile(zip_file_name, 'w') as z:
-        z.write('lambda_handler.py')
-        z.write('mcp_server.py')
-    
-    with open(zip_file_name, 'rb') as f:
-        zip_bytes = f.read()
+    zip_bytes = build_package(runtime=runtime, precompile=precompile)
+    print(f"Package: {len(zip_bytes) / 1024:.1f} KB, {memory_size} MB, {architecture}")
 
     # Create or update Lambda function
     try:
@@ -26,21 +89,24 @@ def deploy_lambda():
             Role=role_arn,
             Handler=handler_name,
             Code={'ZipFile': zip_bytes},
-            Timeout=30,
-            MemorySize=256
+            Timeout=timeout,
+            MemorySize=memory_size,
+            Architectures=[architecture],
+            Environment={'Variables': environment}
         )
         print(f"Created Lambda function: {function_name}")
     except lambda_client.exceptions.ResourceConflictException:
         print("Function already exists. Updating code and configuration...")
-        
+
         # --- THE FIX IS HERE ---
         # 1. Update the code
         print("1/3: Updating function code...")
         lambda_client.update_function_code(
             FunctionName=function_name,
-            ZipFile=zip_bytes
+            ZipFile=zip_bytes,
+            Architectures=[architecture]
         )
-        
+
         # 2. Use a "waiter" to pause until the update is complete
         print("2/3: Waiting for the function code update to complete...")
         waiter = lambda_client.get_waiter('function_updated')
@@ -56,12 +122,118 @@ def deploy_lambda():
             FunctionName=function_name,
             Handler=handler_name,
             Role=role_arn,
-            Timeout=30,
-            MemorySize=256
+            Timeout=timeout,
+            MemorySize=memory_size,
+            Environment=_merged_environment(lambda_client, function_name, environment)
         )
         print("     Configuration updated.")
         # --- END OF FIX ---
 
+    # Wait so that a following report measures the new configuration
+    lambda_client.get_waiter('function_updated').wait(
+        FunctionName=function_name,
+        WaiterConfig={'Delay': 5, 'MaxAttempts': 20}
+    )
+
+def _parse_report(log_tail: str) -> dict:
+    """Figures from the REPORT line of a Lambda log tail"""
+    fields = {
+        'init_ms': r'Init Duration: ([\d.]+) ms',
+        'duration_ms': r'\tDuration: ([\d.]+) ms',
+        'billed_ms': r'Billed Duration: (\d+) ms',
+        'memory_size_mb': r'Memory Size: (\d+) MB',
+        'max_memory_mb': r'Max Memory Used: (\d+) MB'
+    }
+    report = {}
+    for field, pattern in fields.items():
+        match = re.search(pattern, log_tail)
+        if match:
+            report[field] = float(match.group(1))
+    return report
+
+def _invoke(lambda_client, function_name: str, event: dict) -> dict:
+    response = lambda_client.invoke(
+        FunctionName=function_name,
+        LogType='Tail',
+        Payload=json.dumps(event).encode()
+    )
+    return _parse_report(base64.b64decode(response['LogResult']).decode(errors='replace'))
+
+def cold_start_report(function_name: str = FUNCTION_NAME, invocations: int = 5,
+                      method: str = 'get_usage_metrics', params: dict = None) -> dict:
+    """Measure cold and warm invocations from their REPORT log lines.
+
+    Each round changes an environment variable to force a fresh execution
+    environment, then invokes once cold and once warm. These are real
+    requests: get_cost_data costs $0.01 per Cost Explorer call.
+    """
+    lambda_client = boto3.client('lambda')
+    event = {'body': json.dumps({'method': method, 'params': params or {}})}
+    cold, warm = [], []
+    for round_number in range(invocations):
+        lambda_client.update_function_configuration(
+            FunctionName=function_name,
+            Environment=_merged_environment(lambda_client, function_name,
+                                            {'MCP_COLD_START_NONCE': f'{time.time()}-{round_number}'})
+        )
+        lambda_client.get_waiter('function_updated').wait(
+            FunctionName=function_name,
+            WaiterConfig={'Delay': 2, 'MaxAttempts': 30}
+        )
+        cold.append(_invoke(lambda_client, function_name, event))
+        warm.append(_invoke(lambda_client, function_name, event))
+
+    configuration = lambda_client.get_function_configuration(FunctionName=function_name)
+    architecture = configuration.get('Architectures', ['x86_64'])[0]
+    memory_gb = configuration['MemorySize'] / 1024
+
+    def median(samples, field):
+        values = [sample[field] for sample in samples if field in sample]
+        return round(statistics.median(values), 2) if values else None
+
+    warm_billed = median(warm, 'billed_ms') or 0
+    return {
+        'memory_size_mb': configuration['MemorySize'],
+        'architecture': architecture,
+        'invocations': invocations,
+        'init_ms_p50': median(cold, 'init_ms'),
+        'cold_duration_ms_p50': median(cold, 'duration_ms'),
+        'cold_total_ms_p50': round((median(cold, 'init_ms') or 0) + (median(cold, 'duration_ms') or 0), 2),
+        'warm_duration_ms_p50': median(warm, 'duration_ms'),
+        'max_memory_mb': max((sample.get('max_memory_mb', 0) for sample in cold + warm), default=None),
+        'warm_cost_per_million_usd': round(
+            1e6 * (warm_billed / 1000 * memory_gb * PRICE_PER_GB_SECOND[architecture] + PRICE_PER_REQUEST), 4)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Deploy the MCP server Lambda')
+    parser.add_argument('--memory', default='256', help='memory size in MB; a comma list sweeps sizes')
+    parser.add_argument('--architecture', default='x86_64', help='x86_64 or arm64; a comma list sweeps both')
+    parser.add_argument('--precompile', action='store_true', help='ship bytecode (local Python must match the runtime)')
+    parser.add_argument('--prewarm', help='clients to create during init, e.g. ce,cloudwatch')
+    parser.add_argument('--report', type=int, default=0, help='measure this many cold/warm invocation pairs')
+    parser.add_argument('--report-method', default='get_usage_metrics', help='MCP method invoked by the report')
+    args = parser.parse_args()
+
+    prewarm = [name for name in args.prewarm.split(',') if name] if args.prewarm is not None else None
+    reports = []
+    for architecture in args.architecture.split(','):
+        for memory in args.memory.split(','):
+            deploy_lambda(int(memory), architecture, precompile=args.precompile, prewarm_clients=prewarm)
+            if args.report:
+                report = cold_start_report(invocations=args.report, method=args.report_method)
+                reports.append(report)
+                print(f"\nCold start report ({memory} MB, {architecture}):")
+                for key, value in report.items():
+                    print(f"  {key}: {value}")
+
+    if len(reports) > 1:
+        print("\nConfigurations by cold start (init + duration):")
+        for report in sorted(reports, key=lambda r: r['cold_total_ms_p50']):
+            print(f"  {report['memory_size_mb']:>5} MB {report['architecture']:<7} "
+                  f"cold {report['cold_total_ms_p50']:>8} ms  warm {report['warm_duration_ms_p50']} ms  "
+                  f"${report['warm_cost_per_million_usd']}/1M warm requests")
+
 if __name__ == "__main__":
-    deploy_lambda()
-    print("\nDeployment complete. The script now waits for updates to finish.")
\ No newline at end of file
+    main()
+    print("\nDeployment complete. The script now waits for updates to finish.")
@@ -0,0 +1,291 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Union
+from cost_format import cost_matrix
+from instrumentation import Metrics
+from mcp_server import MCPServer, run_batch
+
+# Upper bound on concurrent targets; with at least one worker per target the
+# fan-out takes as long as the slowest target rather than the sum
+FLEET_MAX_WORKERS = 64
+FLEET_TARGET_TIMEOUT_SECONDS = 60
+ASSUME_ROLE_DURATION_SECONDS = 3600
+# Read-only botocore components shared by every pooled session. Each new
+# session otherwise loads and parses the service models again, which makes
+# creating clients for dozens of accounts several times slower (and GIL-bound)
+SHARED_BOTOCORE_COMPONENTS = ('data_loader', 'endpoint_resolver', 'exceptions_factory', 'response_parser_factory')
+DEFAULT_FLEET_REGION = 'us-east-1'
+# Methods run once per account (Cost Explorer is global; insights fan out over
+# regions themselves) or once per (account, region)
+FLEET_METHODS = {
+    'get_cost_data': 'account',
+    'get_cost_anomalies': 'account',
+    'get_cost_forecast': 'account',
+    'get_service_insights': 'account',
+    'get_usage_metrics': 'region',
+    'get_usage_metrics_batch': 'region',
+    'get_rightsizing_candidates': 'region'
+}
+
+class SessionPool:
+    """Cached boto3 sessions for fleet targets.
+
+    A role is assumed once and its credentials are wrapped in botocore's
+    RefreshableCredentials, which assumes the role again shortly before
+    expiry. Sessions, and the clients built from them, can therefore live as
+    long as the process. Targets may instead name a ``profile``, or neither
+    to use the default credentials. Every session shares one set of parsed
+    service models (SHARED_BOTOCORE_COMPONENTS).
+    """
+
+    def __init__(self, base_session=None, role_session_name: str = 'mcp-fleet',
+                 duration_seconds: int = ASSUME_ROLE_DURATION_SECONDS):
+        self._base_session = base_session
+        self.role_session_name = role_session_name
+        self.duration_seconds = duration_seconds
+        self._sts = None
+        self._credentials = {}
+        self._sessions = {}
+        self._components = None
+        self._lock = threading.Lock()
+
+    def _botocore_session(self, profile: str = None):
+        """New botocore session using the pool's shared model loader and caches"""
+        import botocore.session
+        with self._lock:
+            if self._components is None:
+                source = self._base_session._session if self._base_session else botocore.session.get_session()
+                self._components = {name: source.get_component(name) for name in SHARED_BOTOCORE_COMPONENTS}
+        botocore_session = botocore.session.Session(profile=profile)
+        for name, component in self._components.items():
+            botocore_session.register_component(name, component)
+        return botocore_session
+
+    def _sts_client(self):
+        with self._lock:
+            if self._sts is None:
+                import boto3
+                self._sts = (self._base_session or boto3.Session()).client('sts')
+            return self._sts
+
+    def credentials(self, role_arn: str, external_id: str = None):
+        """Auto-refreshing credentials for a role, assuming it on first use"""
+        key = (role_arn, external_id)
+        with self._lock:
+            if key in self._credentials:
+                return self._credentials[key]
+
+        from botocore.credentials import RefreshableCredentials
+
+        def assume_role():
+            request = {
+                'RoleArn': role_arn,
+                'RoleSessionName': self.role_session_name,
+                'DurationSeconds': self.duration_seconds
+            }
+            if external_id:
+                request['ExternalId'] = external_id
+            issued = self._sts_client().assume_role(**request)['Credentials']
+            return {
+                'access_key': issued['AccessKeyId'],
+                'secret_key': issued['SecretAccessKey'],
+                'token': issued['SessionToken'],
+                'expiry_time': issued['Expiration'].isoformat()
+            }
+
+        credentials = RefreshableCredentials.create_from_metadata(assume_role(), assume_role, 'sts-assume-role')
+        with self._lock:
+            return self._credentials.setdefault(key, credentials)
+
+    def session(self, target: Dict[str, Any], region: str = None):
+        """boto3 session for a target in a region"""
+        key = (target.get('role_arn'), target.get('external_id'), target.get('profile'), region)
+        with self._lock:
+            if key in self._sessions:
+                return self._sessions[key]
+
+        import boto3
+        botocore_session = self._botocore_session(None if target.get('role_arn') else target.get('profile'))
+        if target.get('role_arn'):
+            # boto3 takes only static keys, so the refreshable credentials go on the botocore session
+            botocore_session._credentials = self.credentials(target['role_arn'], target.get('external_id'))
+        session = boto3.Session(botocore_session=botocore_session, region_name=region)
+
+        with self._lock:
+            return self._sessions.setdefault(key, session)
+
+class FleetMCPServer:
+    """Run MCPServer methods across many accounts and regions concurrently.
+
+    Each target is a dict with a ``name``, optional ``role_arn`` (and
+    ``external_id``) or ``profile``, and ``regions``. Every (target, region)
+    pair gets its own MCPServer on a pooled session, with separate
+    throttling guards. A failing or timed-out target only marks its own
+    entry in the merged result.
+    """
+
+    def __init__(self, targets: List[Dict[str, Any]], session_pool: SessionPool = None,
+                 max_workers: int = FLEET_MAX_WORKERS, target_timeout: float = FLEET_TARGET_TIMEOUT_SECONDS,
+                 **server_options):
+        names = [target['name'] for target in targets]
+        if len(set(names)) != len(names):
+            raise ValueError('Fleet target names must be unique')
+        shared = {'cost_cache', 'ai_cache', 'cost_store'} & set(server_options)
+        if shared:
+            # Cache keys do not include the account, so one cache would mix accounts' data
+            raise ValueError(f'Caches cannot be shared across fleet targets: {", ".join(sorted(shared))}')
+        self.targets = targets
+        self.session_pool = session_pool or SessionPool()
+        self.max_workers = max_workers
+        self.target_timeout = target_timeout
+        # One Metrics instance for the whole fleet, so lambda_handler can read it
+        self.metrics = server_options.pop('metrics', None) or Metrics()
+        self.server_options = server_options
+        self._servers = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _regions(target: Dict[str, Any]) -> List[str]:
+        return target.get('regions') or [DEFAULT_FLEET_REGION]
+
+    def server_for(self, target: Dict[str, Any], region: str) -> MCPServer:
+        key = (target['name'], region)
+        with self._lock:
+            if key in self._servers:
+                return self._servers[key]
+        # Built outside the lock so that AssumeRole calls for different targets overlap
+        server = MCPServer(
+            session=self.session_pool.session(target, region),
+            guard_scope=target['name'],
+            metrics=self.metrics,
+            **self.server_options
+        )
+        with self._lock:
+            return self._servers.setdefault(key, server)
+
+    def prewarm(self, service_names: List[str]):
+        """Assume every role and create clients up front, concurrently"""
+        units = [(target, region) for target in self.targets for region in self._regions(target)]
+
+        def warm(unit):
+            try:
+                self.server_for(*unit).prewarm(service_names)
+            except Exception as e:
+                print(f"Prewarm failed for {unit[0]['name']}/{unit[1]}: {str(e)}")
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(units)))) as executor:
+            list(executor.map(warm, units))
+
+    def handle_request(self, request: Union[Dict[str, Any], List]) -> Union[Dict[str, Any], List]:
+        """Fan one request out over the fleet and merge the per-target results"""
+        if isinstance(request, list):
+            return run_batch(request, self.handle_request)
+
+        method = request.get('method')
+        params = request.get('params', {})
+        if request.get('stream'):
+            response = {'error': 'Streaming is not supported in fleet mode'}
+        elif method not in FLEET_METHODS:
+            response = {'error': f'Method not supported in fleet mode: {method}'}
+        else:
+            response = {'result': self._fan_out(method, params)}
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    def _units(self, method: str, params: Dict) -> List:
+        units = []
+        for target in self.targets:
+            regions = self._regions(target)
+            if FLEET_METHODS[method] == 'region':
+                units.extend((target, region, params) for region in regions)
+            elif method == 'get_service_insights':
+                units.append((target, regions[0], dict(params, regions=params.get('regions') or regions)))
+            else:
+                units.append((target, regions[0], params))
+        return units
+
+    def _fan_out(self, method: str, params: Dict) -> Dict[str, Any]:
+        started = time.perf_counter()
+        units = self._units(method, params)
+
+        def run(target, region, unit_params):
+            unit_started = time.perf_counter()
+            try:
+                response = self.server_for(target, region).handle_request({'method': method, 'params': unit_params})
+            except Exception as e:
+                # e.g. AccessDenied on AssumeRole: only this target fails
+                response = {'error': str(e)}
+            response['duration_ms'] = round((time.perf_counter() - unit_started) * 1000, 3)
+            return response
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(units))))
+        futures = [executor.submit(run, *unit) for unit in units]
+        done, _ = wait(futures, timeout=self.target_timeout)
+        # Timed-out targets keep their thread until the AWS call returns, but
+        # the response does not wait for them
+        executor.shutdown(wait=False, cancel_futures=True)
+        outcomes = [
+            future.result() if future in done else {'error': f'Target timed out after {self.target_timeout}s'}
+            for future in futures
+        ]
+        return self._merge(method, units, outcomes, started)
+
+    def _merge(self, method: str, units: List, outcomes: List[Dict], started: float) -> Dict[str, Any]:
+        targets = {}
+        slowest = None
+        for (target, region, _), outcome in zip(units, outcomes):
+            label = target['name'] if FLEET_METHODS[method] == 'account' else f"{target['name']}/{region}"
+            if FLEET_METHODS[method] == 'region':
+                targets.setdefault(target['name'], {})[region] = outcome
+            else:
+                targets[target['name']] = outcome
+            if 'duration_ms' in outcome and (slowest is None or outcome['duration_ms'] > slowest[1]):
+                slowest = (label, outcome['duration_ms'])
+
+        failed = sum(1 for outcome in outcomes if 'error' in outcome)
+        merged = {
+            'targets': targets,
+            'succeeded': len(outcomes) - failed,
+            'failed': failed,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            'slowest_target': {'target': slowest[0], 'duration_ms': slowest[1]} if slowest else None
+        }
+        succeeded = [outcome['result'] for outcome in outcomes if 'result' in outcome]
+        if method == 'get_cost_data':
+            merged['fleet_totals'] = self._cost_totals(succeeded)
+        elif method == 'get_service_insights':
+            merged['fleet_totals'] = self._insight_totals(succeeded)
+        return merged
+
+    @staticmethod
+    def _cost_totals(results: List[Dict]) -> Dict[str, float]:
+        """Cost per service summed over every account (raw-format results only)"""
+        totals = {}
+        for result in results:
+            if 'cost_data' not in result:
+                continue
+            _, services, matrix = cost_matrix(result['cost_data'])
+            for index, service in enumerate(services):
+                totals[service] = totals.get(service, 0.0) + sum(row[index] for row in matrix)
+        return {service: round(amount, 4) for service, amount in sorted(totals.items(), key=lambda item: -item[1])}
+
+    @staticmethod
+    def _insight_totals(results: List[Dict]) -> Dict[str, Dict]:
+        """Numeric insight fields per service summed over every account"""
+        per_service = {}
+        for result in results:
+            for service, summary in result.items():
+                if isinstance(summary, dict) and 'error' not in summary:
+                    per_service.setdefault(service, []).append(summary)
+        return {service: MCPServer._sum_region_totals(dict(enumerate(summaries)))
+                for service, summaries in per_service.items()}
+
+def load_targets(config: str) -> List[Dict[str, Any]]:
+    """Fleet targets from a JSON list, or the path of a file holding one"""
+    if not config.lstrip().startswith('['):
+        with open(config) as f:
+            config = f.read()
+    return json.loads(config)
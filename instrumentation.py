@@ -0,0 +1,248 @@
+import io
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+# Histogram bucket upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Series kind -> (Prometheus metric prefix, label name)
+METRIC_KINDS = {
+    'method': ('mcp_method', 'method'),
+    'aws': ('mcp_aws_call', 'operation'),
+    'client_init': ('mcp_client_init', 'service'),
+    'serialize': ('mcp_serialize', 'method'),
+    'invocation': ('mcp_invocation', 'start')
+}
+
+def label_value(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Histogram:
+    """Fixed-bucket latency histogram with error and payload byte counters"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes = 0
+
+    def observe(self, duration_ms: float, error: bool = False, payload_bytes: int = 0):
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.sum_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.bytes += payload_bytes
+        if error:
+            self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (max for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean_ms': round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p90_ms': self.percentile(0.9),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 3),
+            'bytes': self.bytes
+        }
+
+class Metrics:
+    """Per-method and per-upstream-call latency histograms.
+
+    Series are keyed by kind (see METRIC_KINDS) and name, e.g.
+    ``('aws', 'ce.GetCostAndUsage')``. Exported as a JSON snapshot,
+    Prometheus text, or CloudWatch Embedded Metric Format log lines.
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def observe(self, kind: str, name: str, duration_ms: float, error: bool = False, payload_bytes: int = 0):
+        with self._lock:
+            histogram = self._series.get((kind, name))
+            if histogram is None:
+                histogram = self._series[(kind, name)] = Histogram()
+            histogram.observe(duration_ms, error, payload_bytes)
+
+    @contextmanager
+    def timer(self, kind: str, name: str):
+        """Time a block; an exception escaping it counts as an error"""
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.observe(kind, name, (time.perf_counter() - started) * 1000, error)
+
+    def attach(self, client, service_name: str):
+        """Time every API call a botocore client makes, with response sizes"""
+        def before_call(model=None, context=None, **kwargs):
+            if context is not None:
+                context['mcp_operation'] = f'{service_name}.{model.name}'
+                context['mcp_started'] = time.perf_counter()
+
+        def after_call(http_response=None, model=None, context=None, **kwargs):
+            started = (context or {}).pop('mcp_started', None)
+            if started is None:
+                return
+            status = getattr(http_response, 'status_code', 200)
+            # Content-Length, not the body: reading a streaming body here would consume it
+            length = getattr(http_response, 'headers', {}).get('content-length') or 0
+            self.observe('aws', context['mcp_operation'], (time.perf_counter() - started) * 1000,
+                         error=status >= 400, payload_bytes=int(length))
+
+        def after_call_error(context=None, **kwargs):
+            started = (context or {}).pop('mcp_started', None)
+            if started is not None:
+                self.observe('aws', context['mcp_operation'], (time.perf_counter() - started) * 1000, error=True)
+
+        client.meta.events.register('before-call', before_call)
+        client.meta.events.register('after-call', after_call)
+        client.meta.events.register('after-call-error', after_call_error)
+
+    def totals(self, kind: str) -> Dict[str, Dict[str, float]]:
+        """Raw counters for one kind, for diffing before and after a request"""
+        with self._lock:
+            return {
+                name: {'count': h.count, 'errors': h.errors, 'sum_ms': h.sum_ms, 'bytes': h.bytes}
+                for (series_kind, name), h in self._series.items() if series_kind == kind
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summaries grouped by kind, then name"""
+        with self._lock:
+            series = {key: h.summary() for key, h in self._series.items()}
+        snapshot = {kind: {} for kind in METRIC_KINDS}
+        for (kind, name), summary in sorted(series.items()):
+            snapshot.setdefault(kind, {})[name] = summary
+        snapshot['uptime_seconds'] = round(time.time() - self.started_at, 3)
+        return snapshot
+
+    def prometheus_text(self) -> str:
+        """Histograms in Prometheus text exposition format (seconds)"""
+        with self._lock:
+            series = {key: (list(h.buckets), h.count, h.sum_ms, h.errors, h.bytes) for key, h in self._series.items()}
+
+        lines = []
+        for kind, (prefix, label) in METRIC_KINDS.items():
+            entries = sorted((name, values) for (series_kind, name), values in series.items() if series_kind == kind)
+            if not entries:
+                continue
+            lines.append(f'# TYPE {prefix}_duration_seconds histogram')
+            entries = [(label_value(name), values) for name, values in entries]
+            for name, (buckets, count, sum_ms, _, _) in entries:
+                cumulative = 0
+                for bound, bucket in zip(LATENCY_BUCKETS_MS, buckets):
+                    cumulative += bucket
+                    lines.append(f'{prefix}_duration_seconds_bucket{{{label}="{name}",le="{bound / 1000:g}"}} {cumulative}')
+                lines.append(f'{prefix}_duration_seconds_bucket{{{label}="{name}",le="+Inf"}} {count}')
+                lines.append(f'{prefix}_duration_seconds_sum{{{label}="{name}"}} {sum_ms / 1000:.6f}')
+                lines.append(f'{prefix}_duration_seconds_count{{{label}="{name}"}} {count}')
+            lines.append(f'# TYPE {prefix}_errors_total counter')
+            for name, (_, _, _, errors, _) in entries:
+                lines.append(f'{prefix}_errors_total{{{label}="{name}"}} {errors}')
+            if any(values[4] for _, values in entries):
+                lines.append(f'# TYPE {prefix}_bytes_total counter')
+                for name, (_, _, _, _, payload_bytes) in entries:
+                    lines.append(f'{prefix}_bytes_total{{{label}="{name}"}} {payload_bytes}')
+        return '\n'.join(lines) + '\n'
+
+def emf_line(namespace: str, dimensions: Dict[str, str], values: Dict[str, float], units: Dict[str, str] = None) -> str:
+    """One CloudWatch Embedded Metric Format record; printed to the Lambda log,
+    CloudWatch turns it into metrics without any API calls"""
+    units = units or {}
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace,
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': units.get(name, 'Milliseconds')} for name in values]
+            }]
+        }
+    }
+    record.update(dimensions)
+    record.update(values)
+    return json.dumps(record)
+
+class SamplingProfiler:
+    """Run a random ``sample_rate`` fraction of calls under cProfile.
+
+    The top functions by cumulative time are printed (so they land in the
+    Lambda log), and with ``output_dir`` the raw stats are also written as
+    ``.prof`` files for snakeviz/pstats.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, top_n: int = 25, output_dir: str = None):
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self.output_dir = output_dir
+        self.sampled = 0
+        # cProfile cannot run two profilers at once in one process
+        self._lock = threading.Lock()
+
+    def run(self, label: str, fn: Callable[[], Any]) -> Any:
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate or not self._lock.acquire(blocking=False):
+            return fn()
+        try:
+            import cProfile
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(fn)
+            finally:
+                self.sampled += 1
+                self._report(label, profiler)
+        finally:
+            self._lock.release()
+
+    def _report(self, label: str, profiler):
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(self.top_n)
+        print(f'Profile of {label}:\n{out.getvalue()}')
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.output_dir, f'{label}-{int(time.time() * 1000)}.prof'))
+
+def diff_totals(before: Dict[str, Dict], after: Dict[str, Dict]) -> List[Dict[str, Any]]:
+    """Per-name counters accumulated between two ``Metrics.totals`` snapshots"""
+    changes = []
+    for name, values in sorted(after.items()):
+        previous = before.get(name, {})
+        count = values['count'] - previous.get('count', 0)
+        if count:
+            changes.append({
+                'name': name,
+                'count': count,
+                'errors': values['errors'] - previous.get('errors', 0),
+                'total_ms': round(values['sum_ms'] - previous.get('sum_ms', 0.0), 3),
+                'bytes': values['bytes'] - previous.get('bytes', 0)
+            })
+    return changes
@@ -1,22 +1,204 @@
+import base64
+import gzip
 import json
-from mcp_server import MCPServer
+import os
+import time
+from typing import Iterator
+from mcp_server import METHOD_HANDLERS, MCPServer
+from response_cache import ResponseCache, LRUCacheBackend, FileCacheBackend
+from instrumentation import emf_line, diff_totals
+
+# Module scope survives across warm invocations of the same container, so the
+# server (and its boto3 session and lazily-built clients) is built only once.
+_MODULE_LOADED_AT = time.perf_counter()
+_server = None
+_invocations = 0
+
+def get_server() -> MCPServer:
+    """Return the container-wide MCPServer, creating it on first use.
+
+    With MCP_FLEET_CONFIG (a JSON target list or a path to one) this is a
+    FleetMCPServer fanning each request out over those accounts instead.
+    """
+    global _server
+    if _server is None and os.environ.get('MCP_FLEET_CONFIG'):
+        from fleet import FleetMCPServer, load_targets
+        _server = FleetMCPServer(
+            load_targets(os.environ['MCP_FLEET_CONFIG']),
+            profile_sample_rate=float(os.environ.get('MCP_PROFILE_SAMPLE_RATE', '0')),
+            profile_dir=os.environ.get('MCP_PROFILE_DIR')
+        )
+    if _server is None:
+        store_path = os.environ.get('MCP_COST_STORE_PATH')
+        cost_store = None
+        if store_path:
+            from cost_store import SQLiteCostStore
+            cost_store = SQLiteCostStore(store_path)
+        _server = MCPServer(
+            cost_cache=_build_cost_cache(),
+            cost_store=cost_store,
+            profile_sample_rate=float(os.environ.get('MCP_PROFILE_SAMPLE_RATE', '0')),
+            profile_dir=os.environ.get('MCP_PROFILE_DIR')
+        )
+    return _server
+
+def _build_cost_cache() -> ResponseCache:
+    """Cost cache configured from MCP_CACHE_BACKEND / MCP_CACHE_DIR / MCP_CACHE_SWR"""
+    if os.environ.get('MCP_CACHE_BACKEND', 'lru') == 'file':
+        backend = FileCacheBackend(os.environ.get('MCP_CACHE_DIR', '/tmp/mcp-cache'))
+    else:
+        backend = LRUCacheBackend()
+    return ResponseCache(backend, stale_while_revalidate=os.environ.get('MCP_CACHE_SWR') == '1')
+
+def reset_server():
+    """Drop the cached server so the next invocation behaves like a cold start"""
+    global _server, _invocations, _MODULE_LOADED_AT
+    _server = None
+    _invocations = 0
+    _MODULE_LOADED_AT = time.perf_counter()
 
 def lambda_handler(event, context):
     """AWS Lambda handler for MCP Server"""
-    
+    global _invocations
+    started = time.perf_counter()
+    cold_start = _invocations == 0
+    _invocations += 1
+    method = 'unknown'
+    server = None
+
     try:
-        body = event.get('body', '')
+        body = _decode_body(event)
         request_data = json.loads(body)
-        server = MCPServer()
+        method = _method_label(request_data)
+        server = get_server()
+        # A Lambda container serves one request at a time, so the counters that
+        # move between these two snapshots belong to this request.
+        aws_before = server.metrics.totals('aws')
+        init_before = server.metrics.totals('client_init')
         result = server.handle_request(request_data)
-        
-        return {
-            'statusCode': 200,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps(result)
-        }
+        streaming = isinstance(request_data, dict) and bool(request_data.get('stream'))
+
+        if streaming and isinstance(result, Iterator):
+            # API Gateway buffers proxy responses, so the NDJSON lines are joined
+            # here; each line is still produced and serialized one at a time.
+            lines = list(result)
+            meta = _build_meta(cold_start, started)
+            lines.append(json.dumps({'_meta': meta}) + '\n')
+            response = {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/x-ndjson',
+                    'X-MCP-Cold-Start': str(cold_start).lower()
+                },
+                'body': ''.join(lines)
+            }
+        else:
+            meta = _build_meta(cold_start, started)
+            if _wants_timings(request_data):
+                meta['timings'] = {
+                    'request_bytes': len(body),
+                    'aws_calls': diff_totals(aws_before, server.metrics.totals('aws')),
+                    'client_init': diff_totals(init_before, server.metrics.totals('client_init'))
+                }
+            if isinstance(result, dict):
+                result['_meta'] = meta
+
+            serialize_started = time.perf_counter()
+            response_body = json.dumps(result)
+            server.metrics.observe('serialize', method, (time.perf_counter() - serialize_started) * 1000,
+                                   payload_bytes=len(response_body))
+            response = {
+                # A stream request answered with an object was refused (e.g. by FleetMCPServer)
+                'statusCode': 400 if streaming else 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'X-MCP-Cold-Start': str(cold_start).lower(),
+                    # Batch responses are JSON arrays, so the metadata travels here too
+                    'X-MCP-Meta': json.dumps(meta)
+                },
+                'body': response_body
+            }
+        _record_invocation(server, method, cold_start, started, response,
+                           diff_totals(aws_before, server.metrics.totals('aws')))
+        return response
     except Exception as e:
-        return {
+        response = {
             'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
+            'body': json.dumps({'error': str(e), '_meta': _build_meta(cold_start, started)})
         }
+        if server is not None:
+            _record_invocation(server, method, cold_start, started, response, [])
+        return response
+
+def _method_label(request_data) -> str:
+    """Metric label for a request; anything outside the dispatch table is 'unknown',
+    so callers cannot create new metric series"""
+    if isinstance(request_data, list):
+        return 'batch'
+    if isinstance(request_data, dict) and request_data.get('method') in METHOD_HANDLERS:
+        return request_data['method']
+    return 'unknown'
+
+def _wants_timings(request_data) -> bool:
+    """Per-request timings in ``_meta``: opt in with ``"timings": true`` or MCP_META_TIMINGS=1"""
+    if os.environ.get('MCP_META_TIMINGS') == '1':
+        return True
+    return isinstance(request_data, dict) and bool(request_data.get('timings'))
+
+def _record_invocation(server: MCPServer, method: str, cold_start: bool, started: float,
+                       response: dict, aws_calls: list):
+    """Count the invocation and, with MCP_EMF_METRICS=1, log it as an EMF record"""
+    duration_ms = (time.perf_counter() - started) * 1000
+    body_bytes = len(response.get('body', ''))
+    failed = response['statusCode'] >= 500
+    server.metrics.observe('invocation', 'cold' if cold_start else 'warm', duration_ms,
+                           error=failed, payload_bytes=body_bytes)
+    if os.environ.get('MCP_EMF_METRICS') == '1':
+        print(emf_line(
+            'MCPServer',
+            {'Method': method, 'ColdStart': str(cold_start).lower()},
+            {
+                'Duration': round(duration_ms, 3),
+                'AWSCallDuration': round(sum(call['total_ms'] for call in aws_calls), 3),
+                'AWSCalls': sum(call['count'] for call in aws_calls),
+                'ResponseBytes': body_bytes,
+                'Errors': int(failed)
+            },
+            units={'AWSCalls': 'Count', 'ResponseBytes': 'Bytes', 'Errors': 'Count'}
+        ))
+
+def _decode_body(event) -> str:
+    """Request body as text, undoing base64 and gzip request compression"""
+    body = event.get('body') or ''
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    raw = base64.b64decode(body) if event.get('isBase64Encoded') else body.encode()
+    if headers.get('content-encoding') == 'gzip' or raw[:2] == b'\x1f\x8b':
+        raw = gzip.decompress(raw)
+    return raw.decode()
+
+def _build_meta(cold_start: bool, started: float) -> dict:
+    """Timing metadata attached to every response"""
+    meta = {
+        'cold_start': cold_start,
+        'invocation': _invocations,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 3)
+    }
+    if cold_start:
+        # Time from module import to the end of the first request
+        meta['init_ms'] = round((time.perf_counter() - _MODULE_LOADED_AT) * 1000, 3)
+    return meta
+
+def _prewarm():
+    """Create the clients named in MCP_PREWARM_CLIENTS (e.g. "ce,cloudwatch")
+    while the module loads, i.e. in Lambda's init phase. With provisioned
+    concurrency that phase runs before any request arrives."""
+    names = [name.strip() for name in os.environ.get('MCP_PREWARM_CLIENTS', '').split(',') if name.strip()]
+    if not names:
+        return
+    try:
+        get_server().prewarm(names)
+    except Exception as e:
+        # The first request will create the clients (and report the error) instead
+        print(f'Client prewarm failed: {str(e)}')
+
+_prewarm()
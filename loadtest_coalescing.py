@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Load test for request coalescing in MCPServer.handle_request.
+
+Fires bursts of identical concurrent requests at one server whose Cost
+Explorer client answers after a simulated latency (no AWS calls), with
+coalescing off and on, and reports how many upstream calls each needed.
+
+    python loadtest_coalescing.py --clients 50 --bursts 5 --latency 0.2
+"""
+import argparse
+import os
+import threading
+import time
+from botocore.awsrequest import AWSResponse
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'loadtest')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'loadtest')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from mcp_server import MCPServer
+
+def stub_cost_explorer(server: MCPServer, latency: float) -> dict:
+    """Answer GetCostAndUsage locally after ``latency`` seconds; returns a call counter"""
+    counter = {'calls': 0}
+    lock = threading.Lock()
+
+    def handler(**kwargs):
+        with lock:
+            counter['calls'] += 1
+        time.sleep(latency)
+        return AWSResponse('https://ce.local', 200, {}, None), {'ResultsByTime': []}
+
+    server.ce_client.meta.events.register('before-call.cost-explorer.GetCostAndUsage', handler)
+    return counter
+
+def run(coalesce: bool, clients: int, bursts: int, latency: float) -> dict:
+    server = MCPServer(coalesce_requests=coalesce)
+    counter = stub_cost_explorer(server, latency)
+    # The response cache is bypassed so only coalescing is measured
+    request = {'method': 'get_cost_data', 'params': {'days': 30, 'cache': False}}
+    errors = []
+
+    def client():
+        response = server.handle_request(request)
+        if 'error' in response:
+            errors.append(response['error'])
+
+    started = time.perf_counter()
+    for _ in range(bursts):
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {
+        'coalescing': 'on' if coalesce else 'off',
+        'requests': clients * bursts,
+        'upstream_calls': counter['calls'],
+        'errors': len(errors),
+        'elapsed_s': round(elapsed, 3)
+    }
+    if server.single_flight is not None:
+        report['coalesced'] = server.single_flight.stats()['coalesced']
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure upstream call reduction from request coalescing')
+    parser.add_argument('--clients', type=int, default=50, help='concurrent identical requests per burst')
+    parser.add_argument('--bursts', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.2, help='simulated Cost Explorer latency (s)')
+    args = parser.parse_args()
+
+    print("Request Coalescing Load Test:")
+    reports = [run(coalesce, args.clients, args.bursts, args.latency) for coalesce in (False, True)]
+    for report in reports:
+        print(f"\nCOALESCING {report['coalescing'].upper()}:")
+        for key, value in report.items():
+            print(f"  {key}: {value}")
+
+    off, on = reports
+    if on['upstream_calls']:
+        print(f"\nUpstream call reduction: {off['upstream_calls'] / on['upstream_calls']:.1f}x")
+
+if __name__ == "__main__":
+    main()
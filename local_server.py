@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Long-running MCP server for on-box agents and local load tests.
+
+Serves ``MCPServer.handle_request`` without Lambda's invocation overhead,
+timeout or cold starts, either over HTTP (the same JSON protocol as the
+API Gateway endpoint, so ``MCPClient`` works unchanged) or as an MCP
+stdio server (JSON-RPC: initialize, tools/list, tools/call).
+
+    python local_server.py --port 8080
+    python local_server.py --stdio
+
+The server is configured from the same environment variables as the
+Lambda (MCP_CACHE_BACKEND, MCP_COST_STORE_PATH, MCP_FLEET_CONFIG, ...);
+AWS credentials come from the usual chain, e.g. AWS_PROFILE.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional
+from aiohttp import web
+from mcp_server import MCPServer
+
+# Threads for the blocking boto3 work; the event loop itself only does I/O
+LOCAL_MAX_WORKERS = 32
+# Requests admitted at once; HTTP requests beyond this get 503 + Retry-After
+LOCAL_MAX_IN_FLIGHT = 64
+KEEPALIVE_TIMEOUT_SECONDS = 75
+# How long shutdown waits for in-flight requests to finish
+SHUTDOWN_TIMEOUT_SECONDS = 30
+# With compression on, responses at least this large are gzipped for clients that accept it
+COMPRESSION_THRESHOLD = 1024
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+MCP_PROTOCOL_VERSION = '2024-11-05'
+
+# MCPServer methods advertised as MCP tools
+TOOLS = {
+    'get_cost_data': 'AWS cost by service from Cost Explorer (days, granularity, format)',
+    'get_cost_anomalies': 'Services whose recent daily cost deviates from their trailing average (days, window, threshold)',
+    'get_cost_forecast': 'Daily cost forecast per service from the trend and weekday pattern (days, horizon, method)',
+    'get_usage_metrics': 'CloudWatch statistics for one metric over the last 24 hours (service, metric)',
+    'get_usage_metrics_batch': 'Many CloudWatch metrics through packed GetMetricData calls (queries)',
+    'get_service_insights': 'Resource counts for EC2, S3, RDS, Lambda, DynamoDB and ECS (services, regions)',
+    'get_rightsizing_candidates': 'Idle and oversized EC2 instances ranked by p95 CPU and network (days, region, top_n)',
+    'get_ai_analysis': 'Cost optimization recommendations from Bedrock for the given cost data (data)',
+    'get_cache_stats': 'Response cache, coalescing and throttling counters',
+    'get_metrics': 'Latency histograms per method and AWS operation'
+}
+
+class LocalMCPServer:
+    """asyncio front end for an MCPServer.
+
+    Each request runs on a worker thread, so slow AWS calls never block the
+    event loop. At most ``max_in_flight`` requests are admitted: HTTP
+    requests beyond that are answered 503 with Retry-After (MCPClient
+    retries them), and stdio stops reading until a request finishes.
+    Shutdown stops accepting work and waits up to ``shutdown_timeout`` for
+    admitted requests.
+    """
+
+    def __init__(self, server: MCPServer = None, max_workers: int = LOCAL_MAX_WORKERS,
+                 max_in_flight: int = LOCAL_MAX_IN_FLIGHT, keepalive_timeout: float = KEEPALIVE_TIMEOUT_SECONDS,
+                 shutdown_timeout: float = SHUTDOWN_TIMEOUT_SECONDS, compress_responses: bool = False):
+        self.server = server if server is not None else MCPServer()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mcp-worker')
+        self.max_in_flight = max_in_flight
+        self.keepalive_timeout = keepalive_timeout
+        self.shutdown_timeout = shutdown_timeout
+        # Off by default: on loopback gzip costs more time than the bytes it saves
+        self.compress_responses = compress_responses
+        self.in_flight = 0
+        self.served = 0
+        self.rejected = 0
+        self.url = None
+        # Set once the HTTP listener is up (for servers started on a background thread)
+        self.ready = threading.Event()
+        self._closing = False
+        self._loop = None
+        self._stopped = None
+
+    def stop(self):
+        """Begin a graceful shutdown; safe to call from any thread or a signal handler"""
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def _serve(self, request_data: Any, started: float):
+        """Handle and serialize one request (on a worker thread)"""
+        result = self.server.handle_request(request_data)
+        meta = {'duration_ms': round((time.perf_counter() - started) * 1000, 3)}
+        if isinstance(result, dict):
+            result['_meta'] = meta
+        return json.dumps(result), meta
+
+    async def _drain(self):
+        """Wait for admitted requests to finish, up to ``shutdown_timeout``"""
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.in_flight:
+            print(f'Shutting down with {self.in_flight} requests still running', file=sys.stderr)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'status': 'draining' if self._closing else 'ok',
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'served': self.served,
+            'rejected': self.rejected
+        }
+
+    # HTTP
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=MAX_REQUEST_BYTES)
+        app.router.add_post('/', self._handle_http)
+        app.router.add_post('/mcp', self._handle_http)
+        app.router.add_get('/health', self._handle_health)
+        app.router.add_get('/metrics', self._handle_prometheus)
+        return app
+
+    async def serve_http(self, host: str = '127.0.0.1', port: int = 8080):
+        """Serve until ``stop()``, then drain and close"""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        # Idle keep-alive connections are held open so clients skip the TCP handshake
+        runner = web.AppRunner(self.build_app(), keepalive_timeout=self.keepalive_timeout, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        self.url = f'http://{host}:{runner.addresses[0][1]}'
+        print(f'Serving MCP on {self.url}', file=sys.stderr)
+        self.ready.set()
+        try:
+            await self._stopped.wait()
+        finally:
+            self._closing = True
+            await site.stop()
+            await self._drain()
+            await runner.cleanup()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle_http(self, request: web.Request) -> web.StreamResponse:
+        if self._closing or self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            reason = 'Server is shutting down' if self._closing else 'Server busy: too many requests in flight'
+            return web.json_response({'error': reason, 'retryable': True}, status=503, headers={'Retry-After': '1'})
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            # aiohttp already undoes Content-Encoding: gzip; this catches unlabelled gzip bodies
+            raw = await request.read()
+            if raw[:2] == b'\x1f\x8b':
+                raw = gzip.decompress(raw)
+            try:
+                request_data = json.loads(raw)
+            except ValueError as e:
+                return web.json_response({'error': f'Invalid JSON request: {str(e)}'}, status=400)
+
+            if isinstance(request_data, dict) and request_data.get('stream'):
+                return await self._stream_http(request, request_data)
+
+            body, meta = await self._run(self._serve, request_data, started)
+            response = web.Response(text=body, content_type='application/json',
+                                    headers={'X-MCP-Meta': json.dumps(meta)})
+            if self.compress_responses and len(body) >= COMPRESSION_THRESHOLD:
+                # Only applied when the request's Accept-Encoding allows it
+                response.enable_compression()
+            return response
+        except Exception as e:
+            return web.json_response({'error': str(e)}, status=500)
+        finally:
+            self.in_flight -= 1
+            self.served += 1
+
+    async def _stream_http(self, request: web.Request, request_data: Dict) -> web.StreamResponse:
+        """Send NDJSON lines as the handler produces them (chunked transfer)"""
+        lines = await self._run(self.server.handle_request, request_data)
+        if not isinstance(lines, Iterator):
+            # e.g. FleetMCPServer, which answers stream requests with an error object
+            return web.json_response(lines)
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+        try:
+            while True:
+                line = await self._run(next, lines, None)
+                if line is None:
+                    break
+                await response.write(line.encode())
+            await response.write_eof()
+        finally:
+            # Runs the handler's cleanup when the client went away mid-stream
+            await self._run(lines.close)
+        return response
+
+    async def _handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats(), status=503 if self._closing else 200)
+
+    async def _handle_prometheus(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.server.metrics.prometheus_text(), content_type='text/plain')
+
+    # MCP stdio
+
+    async def serve_stdio(self, reader: asyncio.StreamReader = None, write: Callable[[str], None] = None):
+        """Serve newline-delimited JSON-RPC until end of input or ``stop()``"""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        if reader is None:
+            reader = asyncio.StreamReader(limit=MAX_REQUEST_BYTES)
+            await self._loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        if write is None:
+            def write(line):
+                sys.stdout.write(line)
+                sys.stdout.flush()
+
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+
+        async def answer(line: bytes):
+            try:
+                response = await self.handle_message(line)
+                if response is not None:
+                    write(json.dumps(response) + '\n')
+            finally:
+                slots.release()
+
+        stopped = asyncio.ensure_future(self._stopped.wait())
+        try:
+            while True:
+                # Backpressure: no more input is read while max_in_flight requests run
+                await slots.acquire()
+                next_line = asyncio.ensure_future(reader.readline())
+                await asyncio.wait({next_line, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_line.done():
+                    next_line.cancel()
+                    break
+                line = next_line.result()
+                if not line:
+                    break
+                if not line.strip():
+                    slots.release()
+                    continue
+                task = asyncio.ensure_future(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            self._closing = True
+            stopped.cancel()
+            if tasks:
+                await asyncio.wait(tasks, timeout=self.shutdown_timeout)
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_message(self, line: bytes) -> Optional[Dict[str, Any]]:
+        """Answer one JSON-RPC message; notifications get no response"""
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            return _jsonrpc_error(None, -32700, f'Parse error: {str(e)}')
+        if not isinstance(message, dict) or not isinstance(message.get('method'), str):
+            return _jsonrpc_error(message.get('id') if isinstance(message, dict) else None, -32600, 'Invalid request')
+
+        method = message['method']
+        params = message.get('params') or {}
+        if 'id' not in message:
+            return None
+        if method == 'initialize':
+            result = {
+                'protocolVersion': MCP_PROTOCOL_VERSION,
+                'capabilities': {'tools': {}},
+                'serverInfo': {'name': 'mcp-server', 'version': '1.0.0'}
+            }
+        elif method == 'ping':
+            result = {}
+        elif method == 'tools/list':
+            result = {'tools': [
+                {'name': name, 'description': description, 'inputSchema': {'type': 'object'}}
+                for name, description in TOOLS.items()
+            ]}
+        elif method == 'tools/call':
+            result = await self._call_tool(params.get('name'), params.get('arguments') or {})
+        else:
+            return _jsonrpc_error(message['id'], -32601, f'Method not found: {method}')
+        return {'jsonrpc': '2.0', 'id': message['id'], 'result': result}
+
+    async def _call_tool(self, name: str, arguments: Dict) -> Dict[str, Any]:
+        """Run a tool call; MCPServer errors become tool results with isError set"""
+        if name not in TOOLS:
+            return {'content': [{'type': 'text', 'text': f'Unknown tool: {name}'}], 'isError': True}
+        self.in_flight += 1
+        try:
+            response = await self._run(self.server.handle_request, {'method': name, 'params': arguments})
+        except Exception as e:
+            response = {'error': str(e)}
+        finally:
+            self.in_flight -= 1
+            self.served += 1
+        if 'error' in response:
+            return {'content': [{'type': 'text', 'text': json.dumps(response)}], 'isError': True}
+        return {'content': [{'type': 'text', 'text': json.dumps(response['result'])}], 'isError': False}
+
+def _jsonrpc_error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the MCP server locally over HTTP or stdio')
+    parser.add_argument('--host', default='127.0.0.1', help='HTTP bind address')
+    parser.add_argument('--port', type=int, default=8080, help='HTTP port')
+    parser.add_argument('--stdio', action='store_true', help='serve MCP JSON-RPC on stdin/stdout instead of HTTP')
+    parser.add_argument('--workers', type=int, default=LOCAL_MAX_WORKERS, help='worker threads for AWS calls')
+    parser.add_argument('--max-in-flight', type=int, default=LOCAL_MAX_IN_FLIGHT, help='requests admitted at once')
+    parser.add_argument('--shutdown-timeout', type=float, default=SHUTDOWN_TIMEOUT_SECONDS,
+                        help='seconds to wait for in-flight requests on shutdown')
+    parser.add_argument('--compress', action='store_true', help='gzip large responses (for remote clients)')
+    args = parser.parse_args()
+
+    # Same environment-driven configuration (caches, cost store, fleet, prewarm) as the Lambda
+    from lambda_handler import get_server
+    local = LocalMCPServer(get_server(), max_workers=args.workers, max_in_flight=args.max_in_flight,
+                           shutdown_timeout=args.shutdown_timeout, compress_responses=args.compress)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, local.stop)
+        if args.stdio:
+            await local.serve_stdio()
+        else:
+            await local.serve_http(args.host, args.port)
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
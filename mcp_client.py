@@ -1,10 +1,125 @@
+import gzip
 import json
+import random
+import threading
+import time
 import requests
-from typing import Dict, Any
+from collections import deque
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+# Responses worth retrying: throttling and transient gateway failures. A 500
+# is retried only when its body says ``retryable`` (the Lambda answers every
+# exception, bad requests included, with a 500), and a 504 not at all: it is
+# API Gateway's 30 s integration timeout, so each retry would block another 30 s.
+RETRYABLE_STATUS_CODES = {429, 502, 503}
+THROTTLING_MARKERS = ('Throttling', 'TooManyRequests', 'Rate exceeded', 'RequestLimitExceeded')
+
+# Transport-independent pieces shared by MCPClient and AsyncMCPClient
+
+def is_throttled(result: Any) -> bool:
+    """True for a server-side error response that may succeed on retry (e.g. AWS throttling)"""
+    if not isinstance(result, dict) or 'error' not in result:
+        return False
+    if 'retryable' in result:
+        return bool(result['retryable'])
+    return any(marker in str(result['error']) for marker in THROTTLING_MARKERS)
+
+def classify_response(status: int, text: str, retry_after: str = None) -> Tuple[Any, Optional[Dict], Any]:
+    """(result, None, None) for a final answer, or (None, error, retry_after) for one worth retrying"""
+    if status == 200:
+        result = json.loads(text)
+        if not is_throttled(result):
+            return result, None, None
+        return None, {'error': result['error']}, result.get('retry_after')
+    if status in RETRYABLE_STATUS_CODES or (status == 500 and _says_retryable(text)):
+        return None, {'error': f'HTTP {status}: {text}'}, retry_after
+    return {'error': f'HTTP {status}: {text}'}, None, None
+
+def _says_retryable(text: str) -> bool:
+    try:
+        body = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get('retryable') is True
+
+def backoff_delay(attempt: int, retry_after: Any = None, base: float = 0.5, maximum: float = 10.0) -> float:
+    """Full-jitter exponential backoff, honouring Retry-After when given"""
+    if retry_after:
+        try:
+            return min(float(retry_after), maximum)
+        except ValueError:
+            pass
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+def latency_summary(samples: List[float], retries: int) -> Dict[str, Any]:
+    """Percentiles (ms) of latency samples"""
+    samples = sorted(samples)
+    if not samples:
+        return {'count': 0, 'retries': retries}
+
+    def percentile(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p / 100))], 3)
+
+    return {
+        'count': len(samples),
+        'retries': retries,
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'p50_ms': percentile(50),
+        'p90_ms': percentile(90),
+        'p99_ms': percentile(99),
+        'max_ms': round(samples[-1], 3)
+    }
+
+def batch_request(calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Batch body for (method, params) calls, each identified by its index"""
+    return [
+        {'id': index, 'method': method, 'params': params or {}}
+        for index, (method, params) in enumerate(calls)
+    ]
+
+def batch_responses(response: Any, count: int) -> List[Dict[str, Any]]:
+    """Responses to a batch_request in call order; a transport failure becomes an error for every call"""
+    if not isinstance(response, list):
+        return [{'id': index, 'error': response.get('error', 'Invalid batch response')} for index in range(count)]
+
+    by_id = {item.get('id'): item for item in response if isinstance(item, dict)}
+    return [by_id.get(index, {'id': index, 'error': 'Missing response in batch'}) for index in range(count)]
 
 class MCPClient:
-    def __init__(self, server_url: str):
+    def __init__(self, server_url: str, timeout: float = 30, pool_size: int = 10,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 10.0,
+                 compress_requests: bool = False, compression_threshold: int = 1024,
+                 latency_window: int = 1000):
         self.server_url = server_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.compress_requests = compress_requests
+        self.compression_threshold = compression_threshold
+        
+        # One pooled keep-alive session so repeat calls skip DNS, TCP and TLS setup
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip', 'Connection': 'keep-alive'})
+        
+        self.latencies = deque(maxlen=latency_window)
+        self.retries = 0
+        self._stats_lock = threading.Lock()
+    
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
     
     def send_request(self, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """Send MCP request"""
@@ -13,37 +128,169 @@ class MCPClient:
             'params': params or {}
         }
         
-        payload = json.dumps(request_data)
-        
-        headers = {
-            'Content-Type': 'application/json'
+        return self._post(request_data)
+    
+    def send_batch(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Send several (method, params) calls in one request.
+
+        Responses are returned in call order; a transport failure is reported
+        as an error response for every call.
+        """
+        if not calls:
+            return []
+        return batch_responses(self._post(batch_request(calls)), len(calls))
+    
+    def stream_request(self, method: str, params: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """Send a streaming MCP request and yield each NDJSON event as it arrives"""
+        request_data = {
+            'method': method,
+            'params': params or {},
+            'stream': True
         }
         
         try:
-            response = requests.post(
+            with self.session.post(
                 self.server_url,
-                data=payload,
-                headers=headers,
-                timeout=30
-            )
-            if response.status_code != 200:
-                return {'error': f'HTTP {response.status_code}: {response.text}'}
-            return response.json()
+                data=json.dumps(request_data),
+                headers={'Content-Type': 'application/json'},
+                timeout=self.timeout,
+                stream=True
+            ) as response:
+                if response.status_code != 200:
+                    yield {'error': f'HTTP {response.status_code}: {response.text}'}
+                    return
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
         except Exception as e:
-            return {'error': f'Request failed: {str(e)}'}
+            yield {'error': f'Request failed: {str(e)}'}
+    
+    def stream_ai_analysis(self, data: Any, token_budget: int = None) -> Iterator[Dict[str, Any]]:
+        """Stream AI analysis events; text arrives in the ``chunk`` field"""
+        params = {'data': data}
+        if token_budget is not None:
+            params['token_budget'] = token_budget
+        return self.stream_request('get_ai_analysis', params)
+    
+    @contextmanager
+    def batch(self):
+        """Collect calls and send them as one batch when the block exits"""
+        batch = MCPBatch()
+        yield batch
+        batch.responses = self.send_batch(batch.calls)
+    
+    def _post(self, request_data: Any) -> Any:
+        """POST a request (or batch) and decode the JSON response, retrying transient failures"""
+        payload = json.dumps(request_data).encode()
+        
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        if self.compress_requests and len(payload) >= self.compression_threshold:
+            payload = gzip.compress(payload)
+            headers['Content-Encoding'] = 'gzip'
+        
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = self.session.post(
+                    self.server_url,
+                    data=payload,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+                result, error, retry_after = classify_response(
+                    response.status_code, response.text, response.headers.get('Retry-After'))
+                if error is None:
+                    break
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = {'error': f'Request failed: {str(e)}'}
+            except Exception as e:
+                result = {'error': f'Request failed: {str(e)}'}
+                break
+            
+            if attempt >= self.max_retries:
+                result = error
+                break
+            time.sleep(backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_max))
+            attempt += 1
+        
+        with self._stats_lock:
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            self.retries += attempt
+        return result
     
-    def get_cost_analysis(self, days: int = 30) -> Dict[str, Any]:
+    def latency_stats(self) -> Dict[str, Any]:
+        """Latency percentiles (ms) over the most recent requests, retries included"""
+        with self._stats_lock:
+            samples = list(self.latencies)
+            retries = self.retries
+        return latency_summary(samples, retries)
+    
+    def get_cost_analysis(self, days: int = 30, compact: bool = False, top_n: int = None,
+                          rollups: list = None) -> Dict[str, Any]:
         """Get cost analysis from AWS"""
-        return self.send_request('get_cost_data', {'days': days})
+        params = {'days': days}
+        if compact:
+            params.update({'format': 'compact', 'top_n': top_n, 'rollups': rollups or []})
+        return self.send_request('get_cost_data', params)
+    
+    def get_cost_anomalies(self, days: int = 60, lookback_days: int = 1, threshold: float = None) -> Dict[str, Any]:
+        """Get per-service cost anomalies (computed on the server, no model call)"""
+        params = {'days': days, 'lookback_days': lookback_days}
+        if threshold is not None:
+            params['threshold'] = threshold
+        return self.send_request('get_cost_anomalies', params)
+    
+    def get_cost_forecast(self, days: int = 90, horizon: int = 14, method: str = 'seasonal') -> Dict[str, Any]:
+        """Get a daily cost forecast"""
+        return self.send_request('get_cost_forecast', {'days': days, 'horizon': horizon, 'method': method})
     
     def get_usage_metrics(self, service: str = 'AWS/EC2', metric: str = 'CPUUtilization') -> Dict[str, Any]:
         """Get usage metrics"""
         return self.send_request('get_usage_metrics', {'service': service, 'metric': metric})
     
+    def get_usage_metrics_batch(self, queries: list, hours: int = 24) -> Dict[str, Any]:
+        """Get many usage metrics in one request.
+
+        Each query is a dict with ``service``, ``metric`` and optional
+        ``dimensions``, ``stat`` and ``period``.
+        """
+        return self.send_request('get_usage_metrics_batch', {'queries': queries, 'hours': hours})
+    
     def get_service_insights(self, services: list = None) -> Dict[str, Any]:
         """Get service-level insights"""
         return self.send_request('get_service_insights', {'services': services or ['EC2', 'S3', 'RDS']})
     
-    def get_ai_analysis(self, data: str) -> Dict[str, Any]:
-        """Get AI-powered cost optimization analysis"""
-        return self.send_request('get_ai_analysis', {'data': data})
+    def get_rightsizing_candidates(self, days: int = 14, region: str = None, top_n: int = 50) -> Dict[str, Any]:
+        """Get idle and oversized EC2 instances"""
+        params = {'days': days, 'top_n': top_n}
+        if region:
+            params['region'] = region
+        return self.send_request('get_rightsizing_candidates', params)
+    
+    def get_metrics(self, format: str = 'json') -> Dict[str, Any]:
+        """Get server latency histograms; ``format='prometheus'`` for exposition text"""
+        return self.send_request('get_metrics', {'format': format})
+
+    def get_ai_analysis(self, data: Any, token_budget: int = None) -> Dict[str, Any]:
+        """Get AI-powered cost optimization analysis; ``data`` may be a string or a cost result"""
+        params = {'data': data}
+        if token_budget is not None:
+            params['token_budget'] = token_budget
+        return self.send_request('get_ai_analysis', params)
+
+
+class MCPBatch:
+    """Calls queued inside ``MCPClient.batch()``; responses fill in on exit"""
+
+    def __init__(self):
+        self.calls = []
+        self.responses = None
+
+    def add(self, method: str, params: Dict[str, Any] = None) -> int:
+        """Queue a call and return its index into ``responses``"""
+        self.calls.append((method, params or {}))
+        return len(self.calls) - 1
@@ -1,89 +1,489 @@
 import json
-import boto3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Union
+from response_cache import ResponseCache, make_cache_key
+from service_collectors import SERVICE_COLLECTORS
+from cost_format import compact_cost_rows
+from prompt_builder import build_prompt, cost_rows
+from single_flight import SingleFlight
+from throttling import get_guard, guard_stats, error_code, is_retryable
+from instrumentation import Metrics, SamplingProfiler
+import rightsizing
+
+if TYPE_CHECKING:
+    from cost_store import SQLiteCostStore
+
+# Cost Explorer keeps revising today's partial day and recent Estimated rows
+PARTIAL_DAY_TTL_SECONDS = 300
+# A window ending at least this many days ago, with no Estimated rows, is final
+SETTLED_COST_DAYS = 3
+# CloudWatch GetMetricData accepts at most this many queries per call
+MAX_METRIC_DATA_QUERIES = 500
+# GetMetricData chunks in flight at once
+METRIC_DATA_MAX_WORKERS = 8
+# Defaults for the get_service_insights fan-out
+INSIGHTS_MAX_WORKERS = 8
+INSIGHTS_COLLECTOR_TIMEOUT_SECONDS = 20
+# Sub-requests of a batch that may run at the same time
+BATCH_MAX_WORKERS = 8
+# Bedrock model and prompt defaults for get_ai_analysis
+AI_MODEL_ID = 'amazon.titan-text-premier-v1:0'
+AI_PROMPT_TOKEN_BUDGET = 2000
+AI_CACHE_TTL_SECONDS = 3600
+# History loaded by default for get_cost_anomalies / get_cost_forecast
+ANOMALY_HISTORY_DAYS = 60
+FORECAST_HISTORY_DAYS = 90
+# Fewest trailing days the get_ai_analysis anomaly prefilter scores against
+PREFILTER_MIN_WINDOW_DAYS = 5
+# Parsed cost arrays kept for reuse while their cost data stays cached
+COST_FRAME_CACHE_SIZE = 8
+# Read-only methods whose identical concurrent calls share one upstream call
+COALESCED_METHODS = {
+    'get_cost_data',
+    'get_usage_metrics',
+    'get_usage_metrics_batch',
+    'get_service_insights',
+    'get_rightsizing_candidates',
+    'get_ai_analysis',
+    'get_cost_anomalies',
+    'get_cost_forecast'
+}
+# Dispatch table: method name -> MCPServer handler attribute
+METHOD_HANDLERS = {
+    'get_cost_data': '_get_cost_data',
+    'get_cost_anomalies': '_get_cost_anomalies',
+    'get_cost_forecast': '_get_cost_forecast',
+    'get_usage_metrics': '_get_usage_metrics',
+    'get_usage_metrics_batch': '_get_usage_metrics_batch',
+    'get_service_insights': '_get_service_insights',
+    'get_rightsizing_candidates': '_get_rightsizing_candidates',
+    'get_ai_analysis': '_get_ai_analysis',
+    'get_cache_stats': '_get_cache_stats',
+    'get_metrics': '_get_metrics'
+}
+# Retries are done by the shared throttling guards, not per client by botocore
+AWS_CLIENT_RETRIES = {'mode': 'standard', 'max_attempts': 1}
+
+def run_batch(requests: List, handle: Callable[[Dict[str, Any]], Dict[str, Any]],
+              max_workers: int = BATCH_MAX_WORKERS) -> List[Dict[str, Any]]:
+    """Validate batch entries and run ``handle`` on each concurrently; responses
+    come back in request order, each carrying its entry's id (or index)"""
+    if not requests:
+        return []
+
+    def run(index, request):
+        request_id = request.get('id', index) if isinstance(request, dict) else index
+        if not isinstance(request, dict):
+            return {'id': request_id, 'error': 'Batch entries must be request objects'}
+        if request.get('stream'):
+            return {'id': request_id, 'error': 'Streaming is not supported inside a batch'}
+        return dict(handle(request), id=request_id)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(requests))) as executor:
+        return list(executor.map(run, range(len(requests)), requests))
 
 class MCPServer:
-    def __init__(self, aws_profile: str = None):
-        self.session = boto3.Session(profile_name=aws_profile)
-        self._ce_client = None
-        self._cloudwatch_client = None
-        self._bedrock_client = None
+    def __init__(self, aws_profile: str = None, cost_cache: ResponseCache = None,
+                 cost_store: 'SQLiteCostStore' = None, ai_cache: ResponseCache = None,
+                 coalesce_requests: bool = True, metrics: Metrics = None,
+                 profile_sample_rate: float = 0.0, profile_dir: str = None,
+                 session=None, guard_scope: str = None):
+        self.aws_profile = aws_profile
+        # An injected boto3 session (e.g. assumed-role credentials) replaces the profile
+        self._session = session
+        # Separates throttling guards per account, since AWS quotas are per account
+        self.guard_scope = guard_scope
+        self._session_lock = threading.Lock()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.profiler = SamplingProfiler(profile_sample_rate, output_dir=profile_dir)
+        self.single_flight = SingleFlight() if coalesce_requests else None
+        self.cost_cache = cost_cache if cost_cache is not None else ResponseCache()
+        self.ai_cache = ai_cache if ai_cache is not None else ResponseCache()
+        self.cost_store = cost_store
+        self._cost_frames = OrderedDict()
+        self._cost_frames_lock = threading.Lock()
         self._service_clients = {}
+        # boto3 sessions are not thread-safe, so client creation is serialized
+        self._client_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """boto3 session, created on first use so that boto3 (~200 ms to import)
+        is only loaded by requests that reach AWS"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import boto3
+                    self._session = boto3.Session(profile_name=self.aws_profile)
+        return self._session
 
     @property
     def ce_client(self):
-        if not self._ce_client:
-            self._ce_client = self.session.client('ce')
-        return self._ce_client
+        return self.get_service_client('ce')
 
     @property
     def cloudwatch(self):
-        if not self._cloudwatch_client:
-            self._cloudwatch_client = self.session.client('cloudwatch')
-        return self._cloudwatch_client
+        return self.get_service_client('cloudwatch')
 
     @property
     def bedrock(self):
-        if not self._bedrock_client:
-            self._bedrock_client = self.session.client('bedrock-runtime')
-        return self._bedrock_client
-
-    def get_service_client(self, service_name: str):
-        service_name_lower = service_name.lower()
-        if service_name_lower not in self._service_clients:
-            self._service_clients[service_name_lower] = self.session.client(service_name_lower)
-        return self._service_clients[service_name_lower]
+        return self.get_service_client('bedrock-runtime')
+
+    def get_service_client(self, service_name: str, region: str = None, validate: bool = True):
+        """Cached client; ``validate=False`` gives a separate client that skips
+        botocore's client-side parameter validation, for large requests built
+        internally (validating 500 GetMetricData queries costs more CPU than
+        serializing them)"""
+        key = (service_name.lower(), region) if validate else (service_name.lower(), region, 'unvalidated')
+        if key not in self._service_clients:
+            with self._client_lock:
+                if key not in self._service_clients:
+                    from botocore.config import Config
+                    with self.metrics.timer('client_init', key[0]):
+                        client = self.session.client(key[0], region_name=region,
+                                                     config=Config(retries=AWS_CLIENT_RETRIES,
+                                                                   parameter_validation=validate))
+                    self._guard(key[0], region).attach(client)
+                    self.metrics.attach(client, key[0])
+                    self._service_clients[key] = client
+        return self._service_clients[key]
+
+    def prewarm(self, service_names: List[str]):
+        """Create clients ahead of the first request, e.g. during Lambda init"""
+        for service_name in service_names:
+            self.get_service_client(service_name)
+
+    def _guard(self, service_name: str, region: str = None):
+        return get_guard(service_name.lower(), region or self.session.region_name, self.guard_scope)
+
+    def _call_aws(self, service_name: str, operation: str, region: str = None, validate: bool = True, **kwargs):
+        """Call an AWS operation through the service's shared rate limiter,
+        retry budget and circuit breaker"""
+        client = self.get_service_client(service_name, region, validate)
+        return self._guard(service_name, region).call(getattr(client, operation), **kwargs)
         
-    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Process MCP requests and return metadata"""
+    def handle_request(self, request: Union[Dict[str, Any], List]) -> Union[Dict[str, Any], List]:
+        """Process MCP requests and return metadata.
+
+        A list of requests is handled as a batch: sub-requests run concurrently
+        and each response carries the ``id`` of its request. With
+        ``"stream": true`` the response is an iterator of NDJSON lines instead.
+        """
+        if isinstance(request, list):
+            return self._handle_batch(request)
+
+        response = self._handle_single(request)
+        if 'id' in request and isinstance(response, dict):
+            response = dict(response, id=request['id'])
+        return response
+
+    def _handle_batch(self, requests: List) -> List[Dict[str, Any]]:
+        """Run independent sub-requests concurrently, answering each by id"""
+        return run_batch(requests, self._handle_single)
+
+    def _handle_single(self, request: Dict[str, Any]):
+        """Dispatch one request to its handler"""
         method = request.get('method')
         params = request.get('params', {})
+
+        if request.get('stream'):
+            return self._stream_response(method, params)
         
-        handlers = {
-            'get_cost_data': self._get_cost_data,
-            'get_usage_metrics': self._get_usage_metrics,
-            'get_service_insights': self._get_service_insights,
-            'get_ai_analysis': self._get_ai_analysis
-        }
-        
-        if method not in handlers:
+        if method not in METHOD_HANDLERS:
             return {'error': f'Unknown method: {method}'}
-            
+        handler = getattr(self, METHOD_HANDLERS[method])
+
+        started = time.perf_counter()
         try:
-            return {'result': handlers[method](params)}
+            def call():
+                return self.profiler.run(method, lambda: handler(params))
+
+            if self.single_flight is not None and method in COALESCED_METHODS:
+                key = method + ':' + json.dumps(params, sort_keys=True, default=str)
+                result, _ = self.single_flight.do(key, call)
+                response = {'result': result}
+            else:
+                response = {'result': call()}
         except Exception as e:
-            # Added more context to the error
-            return {'error': f"An error occurred in method '{method}': {str(e)}"}
+            response = self._error_response(method, e)
+        self.metrics.observe('method', method, (time.perf_counter() - started) * 1000, error='error' in response)
+        return response
+
+    @staticmethod
+    def _error_response(method: str, error: Exception) -> Dict[str, Any]:
+        """Error payload; AWS errors also carry their code and whether a retry may succeed"""
+        # Added more context to the error
+        response = {'error': f"An error occurred in method '{method}': {str(error)}"}
+        code = error_code(error)
+        if code:
+            response['error_code'] = code
+        if code or is_retryable(error):
+            response['retryable'] = is_retryable(error)
+        if getattr(error, 'retry_after', None) is not None:
+            response['retry_after'] = round(error.retry_after, 3)
+        return response
     
-    def _get_cost_data(self, params: Dict) -> Dict:
-        """Retrieve AWS cost data"""
+    def _stream_response(self, method: str, params: Dict) -> Iterator[str]:
+        """Yield a streaming handler's events as NDJSON lines"""
+        stream_handlers = {
+            'get_cost_data': self._stream_cost_data,
+            'get_ai_analysis': self._stream_ai_analysis
+        }
+
+        if method not in stream_handlers:
+            yield json.dumps({'error': f'Streaming not supported for method: {method}'}) + '\n'
+            return
+
+        started = time.perf_counter()
+        error = False
+        try:
+            for event in stream_handlers[method](params):
+                yield json.dumps(event) + '\n'
+        except Exception as e:
+            error = True
+            yield json.dumps(self._error_response(method, e)) + '\n'
+        finally:
+            self.metrics.observe('method', f'{method}:stream', (time.perf_counter() - started) * 1000, error=error)
+
+    @staticmethod
+    def _cost_window(params: Dict):
+        """Resolve (start_date, end_date) for a cost request; end is exclusive"""
         days = params.get('days', 10)
         end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days)
-        
-        response = self.ce_client.get_cost_and_usage(
-            TimePeriod={
-                'Start': start_date.strftime('%Y-%m-%d'),
-                'End': end_date.strftime('%Y-%m-%d')
-            },
-            Granularity='DAILY',
-            Metrics=['BlendedCost'],
-            GroupBy=[{'Type': 'DIMENSION', 'Key': 'SERVICE'}]
+        if params.get('include_today', False):
+            # Cost Explorer's End is exclusive, so this pulls in today's partial day
+            end_date += timedelta(days=1)
+        return end_date - timedelta(days=days), end_date
+
+    def _get_cost_data(self, params: Dict) -> Dict:
+        """Retrieve AWS cost data.
+
+        ``format: "compact"`` returns a service dictionary with sparse columnar
+        amounts instead of raw ResultsByTime (see cost_format.compact_cost_rows).
+        """
+        result = self._load_cost_data(params)
+        if params.get('format', 'raw') != 'compact':
+            return result
+
+        compact = {key: value for key, value in result.items() if key != 'cost_data'}
+        compact['format'] = 'compact'
+        compact.update(compact_cost_rows(
+            result['cost_data'],
+            top_n=params.get('top_n'),
+            rollups=params.get('rollups', [])
+        ))
+        return compact
+
+    def _load_cost_data(self, params: Dict) -> Dict:
+        """Raw cost data through the response cache and cost store"""
+        days = params.get('days', 10)
+        granularity = params.get('granularity', 'DAILY')
+        group_by = params.get('group_by', 'SERVICE')
+        start_date, end_date = self._cost_window(params)
+
+        def fetch():
+            if self.cost_store is not None and granularity == 'DAILY':
+                return self._fetch_cost_data_incremental(start_date, end_date, group_by)
+            return {
+                'period': f'{start_date} to {end_date}',
+                'cost_data': self._fetch_cost_and_usage(start_date, end_date, granularity, group_by)
+            }
+
+        if not params.get('cache', True):
+            return fetch()
+
+        key = make_cache_key('get_cost_data', {
+            'days': days,
+            'granularity': granularity,
+            'group_by': group_by,
+            'start': str(start_date),
+            'end': str(end_date)
+        })
+        settled = end_date <= datetime.now().date() - timedelta(days=SETTLED_COST_DAYS)
+
+        def ttl(result):
+            # Immutable only once Cost Explorer has finalized every row
+            if settled and not any(row.get('Estimated') for row in result.get('cost_data', [])):
+                return None
+            return PARTIAL_DAY_TTL_SECONDS
+
+        result, status = self.cost_cache.get_or_compute(key, fetch, ttl=ttl)
+        return dict(result, cache=status)
+
+    @staticmethod
+    def _cost_analytics():
+        """cost_analytics is imported on first use: it needs numpy, which the
+        other methods (and a bare Lambda package) do without"""
+        try:
+            import cost_analytics
+        except ImportError as e:
+            raise RuntimeError(f'Cost analytics require numpy: {str(e)}')
+        return cost_analytics
+
+    def _cost_frame(self, rows: List[Dict]):
+        """Cost rows as a cost_analytics.CostFrame.
+
+        Frames are remembered per rows list, so repeated calls over a window
+        served from the in-memory cache skip parsing the rows again.
+        """
+        with self._cost_frames_lock:
+            entry = self._cost_frames.get(id(rows))
+            # The entry holds the rows, so their id cannot be reused while it is cached
+            if entry is not None and entry[0] is rows:
+                self._cost_frames.move_to_end(id(rows))
+                return entry[1]
+
+        frame = self._cost_analytics().cost_frame(rows)
+        with self._cost_frames_lock:
+            self._cost_frames[id(rows)] = (rows, frame)
+            while len(self._cost_frames) > COST_FRAME_CACHE_SIZE:
+                self._cost_frames.popitem(last=False)
+        return frame
+
+    def _get_cost_anomalies(self, params: Dict) -> Dict:
+        """Per-service cost spikes and drops, computed locally without a model call.
+
+        Each of the last ``lookback_days`` days is scored against the trailing
+        ``window`` days (rolling z-score); week-over-week changes come with it.
+        """
+        analytics = self._cost_analytics()
+        data = self._load_cost_data(dict(params, days=params.get('days', ANOMALY_HISTORY_DAYS), granularity='DAILY'))
+        started = time.perf_counter()
+        result = analytics.detect_anomalies(
+            self._cost_frame(data['cost_data']),
+            window=params.get('window', analytics.ANOMALY_WINDOW_DAYS),
+            threshold=params.get('threshold', analytics.ANOMALY_Z_THRESHOLD),
+            lookback_days=params.get('lookback_days', 1),
+            min_delta=params.get('min_delta', analytics.ANOMALY_MIN_DELTA),
+            top_n=params.get('top_n', 10)
         )
-        
+        return dict(result, period=data['period'], cache=data.get('cache'),
+                    compute_ms=round((time.perf_counter() - started) * 1000, 3))
+
+    def _get_cost_forecast(self, params: Dict) -> Dict:
+        """Forecast daily cost ``horizon`` days ahead with a linear or weekly-seasonal model"""
+        analytics = self._cost_analytics()
+        data = self._load_cost_data(dict(params, days=params.get('days', FORECAST_HISTORY_DAYS), granularity='DAILY'))
+        started = time.perf_counter()
+        result = analytics.forecast_costs(
+            self._cost_frame(data['cost_data']),
+            horizon=params.get('horizon', analytics.FORECAST_HORIZON_DAYS),
+            method=params.get('method', 'seasonal'),
+            top_n=params.get('top_n', 10)
+        )
+        return dict(result, period=data['period'], cache=data.get('cache'),
+                    compute_ms=round((time.perf_counter() - started) * 1000, 3))
+
+    def _fetch_cost_data_incremental(self, start_date, end_date, group_by) -> Dict:
+        """Serve closed days from the cost store and fetch only the days it lacks"""
+        dimension = group_by if isinstance(group_by, str) else '|'.join(group_by or [])
+        today = datetime.now().date()
+        closed_end = min(end_date, today)
+
+        fetched_days = 0
+        for range_start, range_end in self.cost_store.missing_ranges(dimension, start_date, closed_end):
+            rows = self._fetch_cost_and_usage(range_start, range_end, 'DAILY', group_by)
+            self.cost_store.put_rows(dimension, range_start, range_end, rows)
+            fetched_days += (range_end - range_start).days
+
+        cost_data = self.cost_store.get_rows(dimension, start_date, closed_end)
+        if end_date > today:
+            # Today's partial day is always fetched live and never persisted
+            cost_data += self._fetch_cost_and_usage(max(start_date, today), end_date, 'DAILY', group_by)
+
         return {
             'period': f'{start_date} to {end_date}',
-            'cost_data': response['ResultsByTime']
+            'cost_data': cost_data,
+            'store': {
+                'stored_days': max((closed_end - start_date).days, 0) - fetched_days,
+                'fetched_days': fetched_days
+            }
         }
-    
+
+    def _stream_cost_data(self, params: Dict) -> Iterator[Dict]:
+        """Stream cost rows page by page without materializing the window"""
+        granularity = params.get('granularity', 'DAILY')
+        group_by = params.get('group_by', 'SERVICE')
+        start_date, end_date = self._cost_window(params)
+
+        yield {'period': f'{start_date} to {end_date}'}
+        count = 0
+        for row in self._iter_cost_and_usage(start_date, end_date, granularity, group_by):
+            count += 1
+            yield {'row': row}
+        yield {'done': True, 'rows': count}
+
+    def _fetch_cost_and_usage(self, start_date, end_date, granularity: str, group_by) -> List[Dict]:
+        """Call Cost Explorer for one date window"""
+        return list(self._iter_cost_and_usage(start_date, end_date, granularity, group_by))
+
+    def _iter_cost_and_usage(self, start_date, end_date, granularity: str, group_by) -> Iterator[Dict]:
+        """Yield ResultsByTime rows across every NextPageToken page.
+
+        Cost Explorer may split one period's groups over consecutive pages, so a
+        row is held back until the next period starts and continuation groups are
+        merged into it.
+        """
+        keys = [group_by] if isinstance(group_by, str) else list(group_by or [])
+        request = {
+            'TimePeriod': {
+                'Start': start_date.strftime('%Y-%m-%d'),
+                'End': end_date.strftime('%Y-%m-%d')
+            },
+            'Granularity': granularity,
+            'Metrics': ['BlendedCost'],
+            'GroupBy': [{'Type': 'DIMENSION', 'Key': key} for key in keys]
+        }
+
+        pending = None
+        while True:
+            response = self._call_aws('ce', 'get_cost_and_usage', **request)
+            for row in response['ResultsByTime']:
+                if pending is not None and row['TimePeriod'] == pending['TimePeriod']:
+                    pending.setdefault('Groups', []).extend(row.get('Groups', []))
+                    continue
+                if pending is not None:
+                    yield pending
+                pending = row
+
+            token = response.get('NextPageToken')
+            if not token:
+                break
+            request['NextPageToken'] = token
+
+        if pending is not None:
+            yield pending
+
+    def _get_cache_stats(self, params: Dict) -> Dict:
+        """Report response cache, request coalescing and AWS throttling counters"""
+        stats = {'cost_data': self.cost_cache.stats(), 'ai_analysis': self.ai_cache.stats()}
+        if self.single_flight is not None:
+            stats['coalescing'] = self.single_flight.stats()
+        stats['throttling'] = guard_stats()
+        return stats
+
+    def _get_metrics(self, params: Dict) -> Dict:
+        """Latency histograms per method, AWS operation and client creation.
+
+        ``format: "prometheus"`` returns the Prometheus text exposition instead.
+        """
+        if params.get('format') == 'prometheus':
+            return {'format': 'prometheus', 'text': self.metrics.prometheus_text()}
+        return dict(self.metrics.snapshot(), profiles_sampled=self.profiler.sampled)
+
     def _get_usage_metrics(self, params: Dict) -> Dict:
         """Get CloudWatch usage metrics"""
         service = params.get('service', 'AWS/EC2')
         metric = params.get('metric', 'CPUUtilization')
         
         try:
-            response = self.cloudwatch.get_metric_statistics(
+            response = self._call_aws(
+                'cloudwatch',
+                'get_metric_statistics',
                 Namespace=service,
                 MetricName=metric,
                 StartTime=datetime.now() - timedelta(hours=24),
@@ -105,52 +505,397 @@ class MCPServer:
                 'count': len(datapoints)
             }
         except Exception as e:
+            # Throttling and outages are reported as errors, not as missing data
+            if is_retryable(e):
+                raise
             return {
                 'service': service,
                 'metric': metric,
                 'error': f'No data available: {str(e)}',
                 'datapoints': []
             }
+
+    def _get_usage_metrics_batch(self, params: Dict) -> Dict:
+        """Get many CloudWatch metrics with packed GetMetricData calls"""
+        queries = params.get('queries', [])
+        hours = params.get('hours', 24)
+        end_time = datetime.now()
+        start_time = end_time - timedelta(hours=hours)
+
+        metric_queries = []
+        for index, query in enumerate(queries):
+            dimensions = query.get('dimensions') or []
+            if isinstance(dimensions, dict):
+                dimensions = [{'Name': name, 'Value': value} for name, value in dimensions.items()]
+            metric_queries.append({
+                'Id': f'm{index}',
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': query.get('service', 'AWS/EC2'),
+                        'MetricName': query.get('metric', 'CPUUtilization'),
+                        'Dimensions': dimensions
+                    },
+                    'Period': query.get('period', 3600),
+                    'Stat': query.get('stat', 'Average')
+                },
+                'ReturnData': True
+            })
+
+        series, api_calls = self._fetch_metric_data(metric_queries, start_time, end_time)
+
+        results = []
+        for query, metric_query in zip(queries, metric_queries):
+            stat = metric_query['MetricStat']['Stat']
+            data = series.get(metric_query['Id'], {})
+            datapoints = [
+                {'Timestamp': timestamp.isoformat(), stat: value}
+                for timestamp, value in zip(data.get('Timestamps', []), data.get('Values', []))
+            ]
+            result = {
+                'service': metric_query['MetricStat']['Metric']['Namespace'],
+                'metric': metric_query['MetricStat']['Metric']['MetricName'],
+                'dimensions': metric_query['MetricStat']['Metric']['Dimensions'],
+                'stat': stat,
+                'datapoints': datapoints,
+                'count': len(datapoints)
+            }
+            if data.get('StatusCode') not in (None, 'Complete'):
+                result['status'] = data['StatusCode']
+            if data.get('Messages'):
+                result['messages'] = [m.get('Value') for m in data['Messages']]
+            results.append(result)
+
+        return {'results': results, 'count': len(results), 'api_calls': api_calls}
+
+    def _fetch_metric_data(self, metric_queries: List[Dict], start_time, end_time, region: str = None,
+                           max_workers: int = METRIC_DATA_MAX_WORKERS, validate: bool = True):
+        """Run queries in chunks of 500, up to ``max_workers`` chunks at a
+        time, each following NextToken. Pass ``validate=False`` only for
+        queries built internally.
+
+        Returns ({query id: merged MetricDataResult}, number of API calls).
+        """
+        def fetch_chunk(chunk):
+            series = {}
+            api_calls = 0
+            request = {
+                'MetricDataQueries': chunk,
+                'StartTime': start_time,
+                'EndTime': end_time,
+                'ScanBy': 'TimestampAscending'
+            }
+            while True:
+                response = self._call_aws('cloudwatch', 'get_metric_data', region, validate, **request)
+                api_calls += 1
+                for data in response['MetricDataResults']:
+                    merged = series.setdefault(data['Id'], {'Timestamps': [], 'Values': [], 'Messages': []})
+                    merged['Timestamps'].extend(data.get('Timestamps', []))
+                    merged['Values'].extend(data.get('Values', []))
+                    merged['Messages'].extend(data.get('Messages', []))
+                    merged['StatusCode'] = data.get('StatusCode')
+                token = response.get('NextToken')
+                if not token:
+                    break
+                request['NextToken'] = token
+            return series, api_calls
+
+        chunks = [metric_queries[offset:offset + MAX_METRIC_DATA_QUERIES]
+                  for offset in range(0, len(metric_queries), MAX_METRIC_DATA_QUERIES)]
+        if len(chunks) > 1 and max_workers > 1:
+            # The shared cloudwatch guard paces the chunks to the account's GetMetricData rate
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+                results = list(executor.map(fetch_chunk, chunks))
+        else:
+            results = [fetch_chunk(chunk) for chunk in chunks]
+
+        series = {}
+        api_calls = 0
+        for chunk_series, chunk_calls in results:
+            series.update(chunk_series)
+            api_calls += chunk_calls
+        return series, api_calls
+
+    def _get_rightsizing_candidates(self, params: Dict) -> Dict:
+        """Rank running EC2 instances that look idle or oversized.
+
+        Instances are paged through DescribeInstances, then CloudWatch
+        computes each one's p95 CPU and network over the ``days`` window in
+        concurrent GetMetricData chunks. See rightsizing.py for thresholds.
+        """
+        region = params.get('region') or self.session.region_name
+        days = params.get('days', rightsizing.RIGHTSIZING_DAYS)
+
+        instances = []
+        request = {'Filters': [{'Name': 'instance-state-name', 'Values': ['running']}], 'MaxResults': 1000}
+        pages = 0
+        while True:
+            response = self._call_aws('ec2', 'describe_instances', region, **request)
+            pages += 1
+            for reservation in response.get('Reservations', []):
+                instances.extend(reservation.get('Instances', []))
+            if not response.get('NextToken'):
+                break
+            request['NextToken'] = response['NextToken']
+
+        end_time = datetime.now()
+        series, metric_calls = self._fetch_metric_data(
+            rightsizing.metric_queries([instance['InstanceId'] for instance in instances], days * 86400),
+            end_time - timedelta(days=days),
+            end_time,
+            region=region,
+            max_workers=params.get('max_workers', METRIC_DATA_MAX_WORKERS),
+            validate=False
+        )
+
+        thresholds = {key: params[key] for key in ('idle_cpu', 'idle_network', 'oversized_cpu') if key in params}
+        result = rightsizing.rank_candidates(instances, series, top_n=params.get('top_n', 50), **thresholds)
+        return dict(
+            result,
+            region=region,
+            days=days,
+            running_instances=len(instances),
+            api_calls={'describe_instances': pages, 'get_metric_data': metric_calls}
+        )
         
     def _get_service_insights(self, params: Dict) -> Dict:
-        """Get service-level insights"""
+        """Get service-level insights.
+
+        Collectors run concurrently per (service, region). With a single region
+        each service maps to its summary; with several, to per-region summaries
+        plus summed totals.
+        """
         services = params.get('services', ['EC2', 'S3', 'RDS'])
+        regions = params.get('regions') or [self.session.region_name or 'us-east-1']
+        max_workers = params.get('max_workers', INSIGHTS_MAX_WORKERS)
+        timeout = params.get('timeout', INSIGHTS_COLLECTOR_TIMEOUT_SECONDS)
+
         insights = {}
-        
+        tasks = []
         for service in services:
-            try:
-                client = self.get_service_client(service)
-                if service == 'EC2':
-                    instances = client.describe_instances()
-                    insights[service] = {
-                        'total_instances': len([i for r in instances['Reservations'] for i in r['Instances']]),
-                        'running_instances': len([i for r in instances['Reservations'] for i in r['Instances'] if i['State']['Name'] == 'running'])
-                    }
-                elif service == 'S3':
-                    buckets = client.list_buckets()
-                    insights[service] = {'bucket_count': len(buckets['Buckets'])}
-            except Exception as e:
-                insights[service] = {'error': str(e)}
-        
-        return insights
+            collector = SERVICE_COLLECTORS.get(service) or next(
+                (c for name, c in SERVICE_COLLECTORS.items() if name.lower() == str(service).lower()), None)
+            if collector is None:
+                insights[service] = {'error': f'No collector registered for service: {service}'}
+                continue
+            # Global services (S3) are collected once, from the first region
+            for region in (regions if collector['regional'] else regions[:1]):
+                tasks.append((service, region, collector))
+
+        outcomes = self._run_collectors(tasks, max_workers, timeout)
+
+        for service, region, collector in tasks:
+            outcome = outcomes[(service, region)]
+            if len(regions) == 1 or not collector['regional']:
+                insights[service] = outcome
+            else:
+                insights.setdefault(service, {'regions': {}})['regions'][region] = outcome
+
+        for service, summary in insights.items():
+            if 'regions' in summary:
+                summary.update(self._sum_region_totals(summary['regions']))
+
+        return {service: insights[service] for service in services if service in insights}
+
+    def _run_collectors(self, tasks: List, max_workers: int, timeout: float) -> Dict:
+        """Run collectors on a bounded pool, giving each ``timeout`` seconds once started"""
+        outcomes = {}
+        started = {}
+
+        def run(service, region, collector):
+            started[(service, region)] = time.monotonic()
+            client = self.get_service_client(collector['client'], region)
+            # Collectors paginate on their own; a throttled page retries the whole collector
+            return self._guard(collector['client'], region).call(collector['collect'], client)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        futures = {executor.submit(run, *task): task[:2] for task in tasks}
+        pending = set(futures)
+        try:
+            while pending:
+                now = time.monotonic()
+                running = [started[futures[f]] for f in pending if futures[f] in started]
+                wait_for = min((s + timeout - now for s in running), default=timeout)
+                done, pending = wait(pending, timeout=max(wait_for, 0), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    try:
+                        outcomes[futures[future]] = future.result()
+                    except Exception as e:
+                        outcomes[futures[future]] = {'error': str(e)}
+
+                now = time.monotonic()
+                for future in list(pending):
+                    key = futures[future]
+                    if key in started and now - started[key] >= timeout:
+                        outcomes[key] = {'error': f'Collector timed out after {timeout}s'}
+                        pending.discard(future)
+        finally:
+            # Timed-out collectors keep their thread until the AWS call returns,
+            # but the response does not wait for them.
+            executor.shutdown(wait=False, cancel_futures=True)
+        return outcomes
+
+    @staticmethod
+    def _sum_region_totals(per_region: Dict) -> Dict:
+        """Sum the top-level numeric fields of successful per-region summaries"""
+        totals = {}
+        for summary in per_region.values():
+            for field, value in summary.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[field] = totals.get(field, 0) + value
+        return totals
     
+    def _ai_request(self, params: Dict):
+        """Compacted prompt, its stats, the generation config and the cache key"""
+        prompt, prompt_stats = build_prompt(
+            params.get('data', ''),
+            token_budget=params.get('token_budget', AI_PROMPT_TOKEN_BUDGET),
+            top_n=params.get('top_n', 10)
+        )
+        generation_config = {
+            'maxTokenCount': 500,
+            'temperature': 0.7
+        }
+        key = make_cache_key('get_ai_analysis', {
+            'model': AI_MODEL_ID,
+            'prompt': prompt,
+            'config': generation_config
+        })
+        return prompt, prompt_stats, generation_config, key
+
     def _get_ai_analysis(self, params: Dict) -> Dict:
-        """Get AI-powered cost optimization insights"""
-        data = params.get('data', '')
-        
-        response = self.bedrock.invoke_model(
-            modelId='amazon.titan-text-premier-v1:0',
-            body=json.dumps({
-                'inputText': f'Analyze this AWS cost/usage data and provide optimization recommendations: {data}',
-                'textGenerationConfig': {
-                    'maxTokenCount': 500,
-                    'temperature': 0.7
+        """Get AI-powered cost optimization insights.
+
+        The input is compacted to ``token_budget`` tokens first, and model
+        responses are cached by a hash of the prompt and generation config.
+        With ``prefilter: "anomalies"``, cost data without any anomaly (see
+        get_cost_anomalies) is answered without calling the model.
+        """
+        if params.get('prefilter') == 'anomalies':
+            anomalies = self._prefilter_anomalies(params.get('data'))
+            if anomalies is not None and not anomalies['anomaly_count']:
+                return {
+                    'analysis': None,
+                    'skipped': 'No cost anomalies found',
+                    'week_over_week': anomalies['week_over_week'],
+                    'model_latency_ms': 0.0
                 }
+
+        prompt, prompt_stats, generation_config, key = self._ai_request(params)
+
+        def invoke():
+            started = time.perf_counter()
+            response = self._call_aws(
+                'bedrock-runtime',
+                'invoke_model',
+                modelId=AI_MODEL_ID,
+                body=json.dumps({
+                    'inputText': prompt,
+                    'textGenerationConfig': generation_config
+                }),
+                contentType="application/json",
+                accept="application/json"
+            )
+            
+            result = json.loads(response['body'].read())
+            # Fix: Correctly parse the response for the Titan model
+            return {
+                'analysis': result['results'][0]['outputText'],
+                'input_tokens': result.get('inputTextTokenCount'),
+                'output_tokens': result['results'][0].get('tokenCount'),
+                'model_latency_ms': round((time.perf_counter() - started) * 1000, 3)
+            }
+
+        if not params.get('cache', True):
+            return dict(invoke(), cache='bypass', **prompt_stats)
+
+        result, status = self.ai_cache.get_or_compute(
+            key, invoke, ttl=params.get('cache_ttl', AI_CACHE_TTL_SECONDS))
+        if status != 'miss':
+            # No model call was made for this request
+            result = dict(result, model_latency_ms=0.0)
+        return dict(result, cache=status, **prompt_stats)
+
+    def _prefilter_anomalies(self, data: Any) -> Dict:
+        """Anomaly detection over cost data passed to get_ai_analysis, or None for other data"""
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                return None
+        rows = cost_rows(data)
+        if not rows:
+            return None
+        analytics = self._cost_analytics()
+        frame = analytics.cost_frame(rows)
+        # Short inputs (run_ai_analysis sends a week) are scored against the days they have;
+        # with too few to score, the model is asked rather than skipped
+        window = min(analytics.ANOMALY_WINDOW_DAYS, len(frame.days) - 1)
+        if window < PREFILTER_MIN_WINDOW_DAYS:
+            return None
+        return analytics.detect_anomalies(frame, window=window)
+
+    def _stream_ai_analysis(self, params: Dict) -> Iterator[Dict]:
+        """Stream the analysis as it is generated.
+
+        Yields a ``prompt`` event, ``chunk`` events carrying text, then a
+        ``done`` event with time-to-first-token and total latency. A cached
+        analysis is replayed as a single chunk, and a completed stream is
+        written back to the cache.
+        """
+        prompt, prompt_stats, generation_config, key = self._ai_request(params)
+        use_cache = params.get('cache', True)
+        yield {'prompt': prompt_stats}
+
+        cached = self.ai_cache.get(key) if use_cache else None
+        if cached is not None:
+            yield {'chunk': cached['analysis'], 'index': 0}
+            yield {'done': True, 'cache': 'hit', 'time_to_first_token_ms': 0.0, 'model_latency_ms': 0.0}
+            return
+
+        started = time.perf_counter()
+        response = self._call_aws(
+            'bedrock-runtime',
+            'invoke_model_with_response_stream',
+            modelId=AI_MODEL_ID,
+            body=json.dumps({
+                'inputText': prompt,
+                'textGenerationConfig': generation_config
             }),
             contentType="application/json",
             accept="application/json"
         )
-        
-        result = json.loads(response['body'].read())
-        # Fix: Correctly parse the response for the Titan model
-        return {'analysis': result['results'][0]['outputText']}
\ No newline at end of file
+
+        parts = []
+        first_token_ms = None
+        input_tokens = output_tokens = None
+        for event in response['body']:
+            if 'chunk' not in event:
+                continue
+            payload = json.loads(event['chunk']['bytes'])
+            text = payload.get('outputText', '')
+            input_tokens = payload.get('inputTextTokenCount', input_tokens)
+            output_tokens = payload.get('totalOutputTextTokenCount', output_tokens)
+            if not text:
+                continue
+            if first_token_ms is None:
+                first_token_ms = round((time.perf_counter() - started) * 1000, 3)
+            parts.append(text)
+            yield {'chunk': text, 'index': len(parts) - 1}
+
+        model_latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        if use_cache:
+            self.ai_cache.set(key, {
+                'analysis': ''.join(parts),
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'model_latency_ms': model_latency_ms
+            }, ttl=params.get('cache_ttl', AI_CACHE_TTL_SECONDS))
+        yield {
+            'done': True,
+            'cache': 'miss' if use_cache else 'bypass',
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'time_to_first_token_ms': first_token_ms,
+            'model_latency_ms': model_latency_ms
+        }
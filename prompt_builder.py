@@ -0,0 +1,95 @@
+import json
+from typing import Any, Dict, List, Tuple
+from cost_format import cost_matrix, cost_unit
+
+PROMPT_PREFIX = 'Analyze this AWS cost/usage data and provide optimization recommendations: '
+# Rough English/JSON average for Titan-family tokenizers
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def cost_rows(data: Any) -> List[Dict]:
+    """ResultsByTime rows if ``data`` looks like get_cost_data output, else None"""
+    if isinstance(data, dict):
+        data = data.get('result', data)
+        if isinstance(data, dict) and isinstance(data.get('cost_data'), list):
+            return data['cost_data']
+    if isinstance(data, list) and data and isinstance(data[0], dict) and 'TimePeriod' in data[0]:
+        return data
+    return None
+
+def _summarize_cost_rows(rows: List[Dict], period: str, top_n: int, include_daily: bool) -> str:
+    """Plain-text cost summary: totals, top-N services, largest daily swings"""
+    days, services, matrix = cost_matrix(rows)
+    unit = cost_unit(rows)
+    daily_totals = [sum(values) for values in matrix]
+    service_totals = [sum(column) for column in zip(*matrix)] if matrix else []
+
+    lines = [f'Period: {period or (days[0] + " to " + days[-1] if days else "n/a")} ({len(days)} days, {unit})']
+    lines.append(f'Total cost: {sum(daily_totals):.2f}')
+    nonzero = [(name, total) for name, total in zip(services, service_totals) if round(total, 2)]
+    lines.append(f'Top {min(top_n, len(nonzero))} of {len(nonzero)} services with non-zero cost:')
+    for name, total in nonzero[:top_n]:
+        lines.append(f'- {name}: {total:.2f}')
+    rest = sum(total for _, total in nonzero[top_n:])
+    if rest:
+        lines.append(f'- All other services: {rest:.2f}')
+
+    if len(daily_totals) > 1:
+        swings = sorted(
+            ((days[i], daily_totals[i] - daily_totals[i - 1]) for i in range(1, len(days))),
+            key=lambda swing: -abs(swing[1])
+        )[:3]
+        lines.append('Largest day-over-day changes: ' + ', '.join(f'{day} {delta:+.2f}' for day, delta in swings))
+    if include_daily:
+        lines.append('Daily totals: ' + ', '.join(f'{day}={total:.2f}' for day, total in zip(days, daily_totals)))
+    return '\n'.join(lines)
+
+def build_prompt(data: Any, token_budget: int = 2000, top_n: int = 10) -> Tuple[str, Dict[str, Any]]:
+    """Build a model prompt that fits ``token_budget``.
+
+    Cost data (raw get_cost_data output, as a dict or JSON string) is reduced
+    to a text summary, shrinking the top-N list and dropping the daily series
+    until it fits. Other input is re-serialized without whitespace and, as a
+    last resort, truncated. Returns (prompt, stats).
+    """
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            pass
+
+    rows = cost_rows(data)
+    if rows is not None:
+        period = data.get('result', data).get('period') if isinstance(data, dict) else None
+        body = None
+        for include_daily in (True, False):
+            n = top_n
+            while n >= 1:
+                body = _summarize_cost_rows(rows, period, n, include_daily)
+                if estimate_tokens(PROMPT_PREFIX + body) <= token_budget:
+                    break
+                n //= 2
+            else:
+                continue
+            break
+    elif isinstance(data, str):
+        body = data
+    else:
+        body = json.dumps(data, separators=(',', ':'), default=str)
+
+    prompt = PROMPT_PREFIX + body
+    truncated = False
+    max_chars = token_budget * CHARS_PER_TOKEN
+    if len(prompt) > max_chars:
+        prompt = prompt[:max_chars]
+        truncated = True
+
+    return prompt, {
+        'prompt_chars': len(prompt),
+        'prompt_tokens_estimate': estimate_tokens(prompt),
+        'token_budget': token_budget,
+        'summarized': rows is not None,
+        'truncated': truncated
+    }
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+# A TTL in seconds, None for immutable, or a function of the value returning either
+TTL = Union[float, None, Callable[[Any], Optional[float]]]
+
+def make_cache_key(namespace: str, parts: Dict[str, Any]) -> str:
+    """Build a stable cache key from a namespace and JSON-serialisable parts"""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f'{namespace}:{digest}'
+
+class LRUCacheBackend:
+    """In-process LRU backend; survives warm Lambda invocations"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+class FileCacheBackend:
+    """One JSON file per key in a local directory (e.g. /tmp on Lambda).
+
+    Files older than ``max_age_seconds`` and the oldest files beyond
+    ``max_entries`` are removed as new entries are written.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 512, max_age_seconds: float = 7 * 86400):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.json')
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, entry: Dict):
+        path = self._path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        cutoff = time.time() - self.max_age_seconds
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json'):
+                    try:
+                        files.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+        files.sort()
+        excess = len(files) - self.max_entries
+        for index, (mtime, path) in enumerate(files):
+            if index < excess or mtime < cutoff:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+class LocalKeyValueStore:
+    """Dict-backed stand-in for a shared store such as Redis or DynamoDB"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._data.get(key)
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._data[key] = value
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+class KeyValueStoreBackend:
+    """Backend for any shared store exposing get/set/delete of string values"""
+
+    def __init__(self, store=None, prefix: str = 'mcp-cache:'):
+        self.store = store if store is not None else LocalKeyValueStore()
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Dict]:
+        raw = self.store.get(self.prefix + key)
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def set(self, key: str, entry: Dict):
+        self.store.set(self.prefix + key, json.dumps(entry))
+
+    def delete(self, key: str):
+        self.store.delete(self.prefix + key)
+
+class ResponseCache:
+    """TTL cache with optional stale-while-revalidate over a pluggable backend.
+
+    A ``ttl`` of ``None`` marks an entry as immutable; a callable ``ttl``
+    is given the computed value and returns the TTL for it.
+    """
+
+    def __init__(self, backend=None, stale_while_revalidate: bool = False):
+        self.backend = backend if backend is not None else LRUCacheBackend()
+        self.stale_while_revalidate = stale_while_revalidate
+        self._counters = {'hits': 0, 'misses': 0, 'stale_hits': 0, 'refreshes': 0, 'refresh_errors': 0}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _store(self, key: str, value: Any, ttl: TTL):
+        if callable(ttl):
+            ttl = ttl(value)
+        now = time.time()
+        self.backend.set(key, {
+            'value': value,
+            'stored_at': now,
+            'expires_at': None if ttl is None else now + ttl
+        })
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       ttl: TTL = None) -> Tuple[Any, str]:
+        """Return ``(value, status)`` where status is 'hit', 'stale' or 'miss'"""
+        entry = self.backend.get(key)
+        if entry is not None:
+            expires_at = entry.get('expires_at')
+            if expires_at is None or expires_at > time.time():
+                self._count('hits')
+                return entry['value'], 'hit'
+            if self.stale_while_revalidate:
+                self._count('stale_hits')
+                self._refresh_in_background(key, compute, ttl)
+                return entry['value'], 'stale'
+
+        self._count('misses')
+        value = compute()
+        self._store(key, value, ttl)
+        return value, 'miss'
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a fresh cached value or None, counting the lookup"""
+        entry = self.backend.get(key)
+        if entry is not None and (entry.get('expires_at') is None or entry['expires_at'] > time.time()):
+            self._count('hits')
+            return entry['value']
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: Any, ttl: TTL = None):
+        """Store a value computed outside get_or_compute (e.g. a finished stream)"""
+        self._store(key, value, ttl)
+
+    def _refresh_in_background(self, key: str, compute: Callable[[], Any], ttl: TTL):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(key, compute(), ttl)
+                self._count('refreshes')
+            except Exception:
+                # Keep serving the stale entry; the next request will retry
+                self._count('refresh_errors')
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def invalidate(self, key: str):
+        self.backend.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters['hits'] + counters['stale_hits'] + counters['misses']
+        counters['hit_ratio'] = round((counters['hits'] + counters['stale_hits']) / lookups, 4) if lookups else 0.0
+        counters['backend'] = type(self.backend).__name__
+        return counters
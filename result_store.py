@@ -0,0 +1,177 @@
+import glob
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+class ResultStore:
+    """Append-only store of automation results as rotated NDJSON segments.
+
+    Writes are queued and performed by a background thread in batches, so
+    callers never block on disk. The active segment rotates once it passes
+    ``segment_max_bytes`` or ``segment_max_age`` seconds; closed segments
+    are gzip-compacted, and segments beyond ``max_segments`` or older than
+    ``retention_days`` are deleted. Compaction runs when the writer starts
+    and every ``compact_interval`` seconds, not only on rotation, so
+    retention applies however slowly segments fill.
+    """
+
+    def __init__(self, directory: str = 'mcp_results', segment_max_bytes: int = 5 * 1024 * 1024,
+                 max_segments: int = 100, retention_days: float = 90, flush_interval: float = 1.0,
+                 segment_max_age: float = 86400, compact_interval: float = 3600):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_segments = max_segments
+        self.retention_days = retention_days
+        self.flush_interval = flush_interval
+        self.segment_max_age = segment_max_age
+        self.compact_interval = compact_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue = queue.Queue()
+        self._closed = False
+        # None until the writer's first pass, which compacts straight away
+        self._last_compacted = None
+        self._segment_path = self._latest_open_segment() or self._new_segment_path()
+        self._writer = threading.Thread(target=self._write_loop, name='result-store-writer', daemon=True)
+        self._writer.start()
+
+    def _new_segment_path(self) -> str:
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        return os.path.join(self.directory, f'results-{stamp}.ndjson')
+
+    def _latest_open_segment(self) -> str:
+        segments = sorted(glob.glob(os.path.join(self.directory, 'results-*.ndjson')))
+        return segments[-1] if segments else None
+
+    @staticmethod
+    def _segment_created(path: str) -> float:
+        stamp = os.path.basename(path).split('.')[0][len('results-'):]
+        return datetime.strptime(stamp, '%Y%m%dT%H%M%S%f').timestamp()
+
+    def _segments(self) -> List[str]:
+        """All segments, oldest first (names sort by creation time)"""
+        paths = glob.glob(os.path.join(self.directory, 'results-*.ndjson*'))
+        return sorted(paths, key=lambda path: os.path.basename(path).split('.')[0])
+
+    def append(self, entry: Dict[str, Any]):
+        """Queue an entry for writing; returns immediately"""
+        if self._closed:
+            raise RuntimeError('ResultStore is closed')
+        self._queue.put(entry)
+
+    def _write_loop(self):
+        while True:
+            self._maintain()
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            entries = [entry for entry in batch if entry is not None]
+            try:
+                if entries:
+                    self._write(entries)
+            except Exception as e:
+                print(f'Result store write failed: {str(e)}')
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, entries: List[Dict]):
+        lines = ''.join(json.dumps(entry, separators=(',', ':'), default=str) + '\n' for entry in entries)
+        with open(self._segment_path, 'a') as f:
+            f.write(lines)
+        if os.path.getsize(self._segment_path) >= self.segment_max_bytes:
+            self._rotate()
+
+    def _maintain(self):
+        """Rotate an aged active segment and compact, at most every ``compact_interval`` seconds"""
+        now = time.monotonic()
+        if self._last_compacted is not None and now - self._last_compacted < self.compact_interval:
+            return
+        self._last_compacted = now
+        try:
+            active = self._segment_path
+            if os.path.exists(active) and time.time() - self._segment_created(active) >= self.segment_max_age:
+                self._rotate()
+            else:
+                self.compact()
+        except Exception as e:
+            print(f'Result store compaction failed: {str(e)}')
+
+    def _rotate(self):
+        closed = self._segment_path
+        self._segment_path = self._new_segment_path()
+        self.compact(exclude=self._segment_path)
+        return closed
+
+    def compact(self, exclude: str = None):
+        """Gzip closed segments and apply retention"""
+        active = exclude or self._segment_path
+        for path in self._segments():
+            if path.endswith('.ndjson') and path != active:
+                with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb') as target:
+                    target.write(source.read())
+                # Keep the last-write time, which retention is measured from
+                stat = os.stat(path)
+                os.utime(path + '.gz', (stat.st_atime, stat.st_mtime))
+                os.remove(path)
+
+        cutoff = time.time() - self.retention_days * 86400
+        segments = [path for path in self._segments() if path != active]
+        excess = len(segments) + 1 - self.max_segments
+        for index, path in enumerate(segments):
+            if index < excess or os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+    def flush(self):
+        """Block until every queued entry is on disk"""
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    def _read_segment(self, path: str) -> List[Dict]:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def query(self, operation: str = None, last_n: int = 10) -> List[Dict]:
+        """The last ``last_n`` entries (optionally for one operation), oldest first"""
+        found = []
+        for path in reversed(self._segments()):
+            entries = [e for e in self._read_segment(path) if operation is None or e.get('operation') == operation]
+            found = entries + found
+            if len(found) >= last_n:
+                break
+        return found[-last_n:] if last_n else found
+
+    def trend(self, operation: str, extract: Callable[[Any], Any], last_n: int = 10) -> List[Dict]:
+        """``extract(result)`` for each of the last N runs of an operation"""
+        points = []
+        for entry in self.query(operation, last_n):
+            try:
+                value = extract(entry['result'])
+            except Exception:
+                value = None
+            points.append({'timestamp': entry['timestamp'], 'value': value})
+        return points
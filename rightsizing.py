@@ -0,0 +1,118 @@
+from typing import Any, Dict, List, Optional
+
+RIGHTSIZING_DAYS = 14
+# p95 CPU below which an instance counts as idle, if its network is quiet too
+IDLE_CPU_P95 = 5.0
+# p95 of NetworkIn + NetworkOut per monitoring interval (5 minutes, or 1 with detailed monitoring)
+IDLE_NETWORK_P95_BYTES = 1024 * 1024
+# p95 CPU below which the instance would still be under ~80% at half the size
+OVERSIZED_CPU_P95 = 40.0
+# The next size down within a family, where it has half the vCPUs and memory
+HALF_SIZE = {
+    'xlarge': 'large',
+    '2xlarge': 'xlarge',
+    '4xlarge': '2xlarge',
+    '8xlarge': '4xlarge',
+    '16xlarge': '8xlarge',
+    '24xlarge': '12xlarge',
+    '32xlarge': '16xlarge',
+    '48xlarge': '24xlarge'
+}
+# Utilization series per instance: (query id prefix, metric name, statistic)
+UTILIZATION_METRICS = (
+    ('cpu', 'CPUUtilization', 'p95'),
+    ('cpumax', 'CPUUtilization', 'Maximum'),
+    ('netin', 'NetworkIn', 'p95'),
+    ('netout', 'NetworkOut', 'p95')
+)
+
+def metric_queries(instance_ids: List[str], period: int) -> List[Dict]:
+    """GetMetricData queries for every instance's utilization.
+
+    ``period`` spans the whole window, so CloudWatch computes each p95 from
+    the raw samples and returns a single datapoint per query instead of a
+    series to download and sort.
+    """
+    return [
+        {
+            'Id': f'{prefix}{index}',
+            'MetricStat': {
+                'Metric': {
+                    'Namespace': 'AWS/EC2',
+                    'MetricName': metric,
+                    'Dimensions': [{'Name': 'InstanceId', 'Value': instance_id}]
+                },
+                'Period': period,
+                'Stat': stat
+            },
+            'ReturnData': True
+        }
+        for index, instance_id in enumerate(instance_ids)
+        for prefix, metric, stat in UTILIZATION_METRICS
+    ]
+
+def smaller_type(instance_type: str) -> Optional[str]:
+    """The same family at half the size, e.g. m5.2xlarge -> m5.xlarge"""
+    family, _, size = instance_type.partition('.')
+    return f'{family}.{HALF_SIZE[size]}' if size in HALF_SIZE else None
+
+def utilization(series: Dict[str, Dict], index: int) -> Optional[Dict[str, float]]:
+    """An instance's statistics from GetMetricData results, or None without CPU data"""
+    stats = {}
+    for prefix, _, _ in UTILIZATION_METRICS:
+        # A window that straddles a period boundary yields two datapoints; keep the higher
+        values = series.get(f'{prefix}{index}', {}).get('Values', [])
+        stats[prefix] = max(values) if values else None
+    if stats['cpu'] is None:
+        return None
+    return stats
+
+def classify(stats: Dict[str, float], idle_cpu: float = IDLE_CPU_P95,
+             idle_network: float = IDLE_NETWORK_P95_BYTES, oversized_cpu: float = OVERSIZED_CPU_P95) -> Optional[str]:
+    """'idle', 'oversized' or None for an instance's utilization statistics"""
+    network = (stats['netin'] or 0.0) + (stats['netout'] or 0.0)
+    if stats['cpu'] < idle_cpu and network < idle_network:
+        return 'idle'
+    if stats['cpu'] < oversized_cpu:
+        return 'oversized'
+    return None
+
+def rank_candidates(instances: List[Dict], series: Dict[str, Dict], top_n: int = 50,
+                    **thresholds) -> Dict[str, Any]:
+    """Idle instances first, then oversized ones, each by ascending p95 CPU.
+
+    ``instances`` are DescribeInstances entries in the order their queries
+    were built.
+    """
+    candidates = []
+    no_data = 0
+    for index, instance in enumerate(instances):
+        stats = utilization(series, index)
+        if stats is None:
+            # Launched too recently, or its metrics are not published
+            no_data += 1
+            continue
+        category = classify(stats, **thresholds)
+        if category is None:
+            continue
+        suggested = smaller_type(instance.get('InstanceType', '')) if category == 'oversized' else None
+        candidates.append({
+            'instance_id': instance['InstanceId'],
+            'instance_type': instance.get('InstanceType'),
+            'name': next((tag['Value'] for tag in instance.get('Tags', []) if tag.get('Key') == 'Name'), None),
+            'category': category,
+            'cpu_p95': round(stats['cpu'], 2),
+            'cpu_max': round(stats['cpumax'], 2) if stats['cpumax'] is not None else None,
+            'network_p95_bytes': round((stats['netin'] or 0.0) + (stats['netout'] or 0.0)),
+            'suggested_type': suggested,
+            'projected_cpu_p95': round(stats['cpu'] * 2, 2) if suggested else None
+        })
+
+    candidates.sort(key=lambda candidate: (candidate['category'] != 'idle', candidate['cpu_p95']))
+    return {
+        'analyzed': len(instances) - no_data,
+        'no_data': no_data,
+        'idle_count': sum(1 for candidate in candidates if candidate['category'] == 'idle'),
+        'oversized_count': sum(1 for candidate in candidates if candidate['category'] == 'oversized'),
+        'candidates': candidates[:top_n] if top_n else candidates
+    }
@@ -0,0 +1,248 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
+
+class Job:
+    """A scheduled operation: either every ``interval`` seconds or daily at ``at`` (HH:MM, local time)"""
+
+    def __init__(self, name: str, fn: Callable[[], Any], interval: float = None, at: str = None,
+                 timeout: float = None, jitter: float = 0.0, skip_if_running: bool = True,
+                 catch_up: bool = True):
+        if (interval is None) == (at is None):
+            raise ValueError(f"Job '{name}' needs exactly one of interval or at")
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.at = at
+        self.timeout = timeout
+        self.jitter = jitter
+        self.skip_if_running = skip_if_running
+        self.catch_up = catch_up
+        self.next_run = None
+        self.running_since = None
+        # A timed-out call that has not returned yet; the job stays busy until it does
+        self.overrunning = False
+        self.metrics = {
+            'runs': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'skipped': 0,
+            'catch_up_runs': 0,
+            'last_lag_seconds': None,
+            'last_duration_seconds': None,
+            'last_status': None
+        }
+
+    def next_after(self, moment: float) -> float:
+        """First scheduled time strictly after ``moment`` (epoch seconds), before jitter"""
+        if self.interval is not None:
+            return moment + self.interval
+        hour, minute = (int(part) for part in self.at.split(':'))
+        candidate = datetime.fromtimestamp(moment).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate.timestamp() <= moment:
+            candidate += timedelta(days=1)
+        return candidate.timestamp()
+
+class JobScheduler:
+    """Dispatches due jobs to a worker pool instead of running them inline.
+
+    A job still running when it comes due again is skipped (skip_if_running).
+    A job with a timeout runs on its own thread; once it overruns, the run is
+    reported as timed out and its worker is freed. Python threads cannot be
+    killed, so the job stays busy (later runs are skipped, whatever
+    skip_if_running says) until the abandoned call returns, and that call's
+    outcome is discarded. Runs never overlap a timed-out one. Last-run times are
+    persisted to ``state_file``, so after a restart jobs resume their cadence
+    and any run missed while the process was down is caught up once.
+    """
+
+    def __init__(self, state_file: str = 'mcp_scheduler_state.json', max_workers: int = 4,
+                 metrics_file: str = None, tick_seconds: float = 1.0):
+        self.state_file = state_file
+        self.metrics_file = metrics_file
+        self.tick_seconds = tick_seconds
+        self.jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        # Serializes state/metrics file writes from concurrent job threads
+        self._io_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._state = self._load_state()
+
+    def add_job(self, job: Job) -> Job:
+        self.jobs[job.name] = job
+        self._plan_first_run(job, time.time())
+        return job
+
+    def every(self, seconds: float, name: str, fn: Callable[[], Any], **options) -> Job:
+        return self.add_job(Job(name, fn, interval=seconds, **options))
+
+    def daily_at(self, at: str, name: str, fn: Callable[[], Any], **options) -> Job:
+        return self.add_job(Job(name, fn, at=at, **options))
+
+    def _load_state(self) -> Dict[str, Dict]:
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        with self._lock:
+            state = json.dumps(self._state, indent=2)
+        tmp_path = f'{self.state_file}.tmp'
+        with self._io_lock:
+            with open(tmp_path, 'w') as f:
+                f.write(state)
+            os.replace(tmp_path, self.state_file)
+
+    def _plan_first_run(self, job: Job, now: float):
+        last_run = self._state.get(job.name, {}).get('last_run')
+        if last_run is None:
+            # Never run before: interval jobs start now, daily jobs wait for their slot
+            job.next_run = now if job.interval is not None else job.next_after(now)
+            return
+        due = job.next_after(last_run)
+        if due <= now and job.catch_up:
+            job.next_run = now
+            job.metrics['catch_up_runs'] += 1
+        elif due <= now:
+            job.next_run = job.next_after(now)
+        else:
+            job.next_run = due
+
+    def run_pending(self, now: float = None):
+        """Dispatch every job that is due; never blocks on a job"""
+        now = time.time() if now is None else now
+        for job in self.jobs.values():
+            if job.next_run is None or job.next_run > now:
+                continue
+            scheduled = job.next_run
+            job.next_run = job.next_after(now) + random.uniform(0, job.jitter)
+            with self._lock:
+                if job.running_since is not None and (job.skip_if_running or job.overrunning):
+                    job.metrics['skipped'] += 1
+                    continue
+                job.running_since = now
+            self._executor.submit(self._run_job, job, scheduled)
+
+    @staticmethod
+    def _invoke(job: Job) -> str:
+        try:
+            job.fn()
+            return 'success'
+        except Exception as e:
+            print(f"Job '{job.name}' failed: {str(e)}")
+            return 'failure'
+
+    def _run_job(self, job: Job, scheduled: float):
+        started = time.time()
+        with self._lock:
+            job.metrics['last_lag_seconds'] = round(started - scheduled, 3)
+            job.metrics['last_status'] = 'running'
+            self._state[job.name] = dict(self._state.get(job.name, {}), last_run=started)
+        self._save_state()
+        if job.timeout is None:
+            self._finish_run(job, started, self._invoke(job))
+            return
+
+        # Run on a daemon thread so an overrun frees this worker. ``run`` is
+        # only read and written under the lock, so exactly one side finishes it.
+        run = {'status': None, 'abandoned': False}
+
+        def target():
+            status = self._invoke(job)
+            with self._lock:
+                run['status'] = status
+                if run['abandoned']:
+                    # Already reported as a timeout; the late outcome is discarded
+                    job.running_since = None
+                    job.overrunning = False
+
+        thread = threading.Thread(target=target, name=f'job-{job.name}', daemon=True)
+        thread.start()
+        thread.join(job.timeout)
+        with self._lock:
+            status = run['status']
+            if status is None:
+                run['abandoned'] = True
+                job.overrunning = True
+        if status is None:
+            print(f"Job '{job.name}' exceeded its {job.timeout}s timeout; "
+                  f"its runs are skipped until the abandoned call returns")
+        self._finish_run(job, started, status or 'timeout')
+
+    def _finish_run(self, job: Job, started: float, status: str):
+        duration = time.time() - started
+        with self._lock:
+            if status != 'timeout':
+                job.running_since = None
+            job.metrics['runs'] += 1
+            if status == 'failure':
+                job.metrics['failures'] += 1
+            elif status == 'timeout':
+                job.metrics['timeouts'] += 1
+            job.metrics['last_duration_seconds'] = round(duration, 3)
+            job.metrics['last_status'] = status
+            self._state[job.name] = dict(self._state[job.name], last_status=status,
+                                         last_duration_seconds=round(duration, 3))
+        self._save_state()
+        self._export_metrics()
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Per-job counters plus lag, duration and next run"""
+        with self._lock:
+            return {
+                name: dict(job.metrics, running=job.running_since is not None, overrunning=job.overrunning,
+                           next_run=datetime.fromtimestamp(job.next_run).isoformat() if job.next_run else None)
+                for name, job in self.jobs.items()
+            }
+
+    def prometheus_text(self) -> str:
+        """Job metrics in Prometheus text exposition format"""
+        lines = []
+        gauges = {
+            'runs': 'mcp_job_runs_total',
+            'failures': 'mcp_job_failures_total',
+            'timeouts': 'mcp_job_timeouts_total',
+            'skipped': 'mcp_job_skipped_total',
+            'last_lag_seconds': 'mcp_job_lag_seconds',
+            'last_duration_seconds': 'mcp_job_duration_seconds'
+        }
+        metrics = self.metrics()
+        for field, metric in gauges.items():
+            lines.append(f'# TYPE {metric} {"counter" if metric.endswith("_total") else "gauge"}')
+            for name, values in metrics.items():
+                if values[field] is not None:
+                    lines.append(f'{metric}{{job="{name}"}} {values[field]}')
+        return '\n'.join(lines) + '\n'
+
+    def _export_metrics(self):
+        if not self.metrics_file:
+            return
+        if self.metrics_file.endswith('.prom'):
+            content = self.prometheus_text()
+        else:
+            content = json.dumps(self.metrics(), indent=2)
+        tmp_path = f'{self.metrics_file}.tmp'
+        with self._io_lock:
+            with open(tmp_path, 'w') as f:
+                f.write(content)
+            os.replace(tmp_path, self.metrics_file)
+
+    def run_forever(self):
+        """Dispatch loop; wakes at the next due time or every ``tick_seconds``"""
+        while not self._stop.is_set():
+            self.run_pending()
+            upcoming = min((job.next_run for job in self.jobs.values() if job.next_run), default=None)
+            delay = self.tick_seconds if upcoming is None else min(max(upcoming - time.time(), 0), self.tick_seconds)
+            self._stop.wait(delay)
+
+    def stop(self, wait: bool = True):
+        self._stop.set()
+        self._executor.shutdown(wait=wait)
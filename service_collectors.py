@@ -0,0 +1,80 @@
+from collections import Counter
+from typing import Callable, Dict
+
+# Registry of service insight collectors, keyed by the name used in
+# get_service_insights params (e.g. 'EC2'). Each entry names the boto3 client,
+# whether the service is regional, and the function that summarises it.
+SERVICE_COLLECTORS = {}
+
+def register_collector(name: str, client_name: str, collect: Callable, regional: bool = True):
+    """Register (or replace) the collector used for a service"""
+    SERVICE_COLLECTORS[name] = {
+        'client': client_name,
+        'collect': collect,
+        'regional': regional
+    }
+
+def _paginate(client, operation: str, result_key: str, **kwargs):
+    """Yield every item of a paginated list operation"""
+    for page in client.get_paginator(operation).paginate(**kwargs):
+        for item in page.get(result_key, []):
+            yield item
+
+def collect_ec2(client) -> Dict:
+    states = Counter()
+    types = Counter()
+    for page in client.get_paginator('describe_instances').paginate():
+        for reservation in page['Reservations']:
+            for instance in reservation['Instances']:
+                states[instance['State']['Name']] += 1
+                types[instance.get('InstanceType', 'unknown')] += 1
+    return {
+        'total_instances': sum(states.values()),
+        'running_instances': states['running'],
+        'instance_states': dict(states),
+        'instance_types': dict(types)
+    }
+
+def collect_s3(client) -> Dict:
+    if client.can_paginate('list_buckets'):
+        bucket_count = sum(1 for _ in _paginate(client, 'list_buckets', 'Buckets'))
+    else:
+        bucket_count = len(client.list_buckets()['Buckets'])
+    return {'bucket_count': bucket_count}
+
+def collect_rds(client) -> Dict:
+    statuses = Counter()
+    engines = Counter()
+    for db in _paginate(client, 'describe_db_instances', 'DBInstances'):
+        statuses[db.get('DBInstanceStatus', 'unknown')] += 1
+        engines[db.get('Engine', 'unknown')] += 1
+    return {
+        'db_instance_count': sum(statuses.values()),
+        'available_instances': statuses['available'],
+        'engines': dict(engines)
+    }
+
+def collect_lambda(client) -> Dict:
+    runtimes = Counter()
+    total_memory = 0
+    for function in _paginate(client, 'list_functions', 'Functions'):
+        runtimes[function.get('Runtime', 'container')] += 1
+        total_memory += function.get('MemorySize', 0)
+    return {
+        'function_count': sum(runtimes.values()),
+        'runtimes': dict(runtimes),
+        'total_memory_mb': total_memory
+    }
+
+def collect_dynamodb(client) -> Dict:
+    return {'table_count': sum(1 for _ in _paginate(client, 'list_tables', 'TableNames'))}
+
+def collect_ecs(client) -> Dict:
+    return {'cluster_count': sum(1 for _ in _paginate(client, 'list_clusters', 'clusterArns'))}
+
+register_collector('EC2', 'ec2', collect_ec2)
+register_collector('S3', 's3', collect_s3, regional=False)
+register_collector('RDS', 'rds', collect_rds)
+register_collector('Lambda', 'lambda', collect_lambda)
+register_collector('DynamoDB', 'dynamodb', collect_dynamodb)
+register_collector('ECS', 'ecs', collect_ecs)
@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+import pytest
+from automation_framework import MCPAutomationFramework, TaskGraph
+
+def test_independent_tasks_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+    graph = TaskGraph(max_workers=3)
+    for name in ('a', 'b', 'c'):
+        # Each task waits for the others, so this only finishes if all three run at once
+        graph.add(name, lambda deps, name=name: (barrier.wait(), name)[1])
+    results, report = graph.run()
+    assert results == {'a': 'a', 'b': 'b', 'c': 'c'}
+    assert set(report['tasks']) == {'a', 'b', 'c'}
+
+def test_dependencies_receive_results_and_failures():
+    graph = TaskGraph()
+    graph.add('fetch', lambda deps: {'cost': 10})
+    graph.add('broken', lambda deps: 1 / 0)
+    graph.add('analyse', lambda deps: (deps['fetch']['cost'] * 2, deps['broken']), depends_on=['fetch', 'broken'])
+    results, _ = graph.run()
+    assert results['analyse'][0] == 20
+    assert results['analyse'][1]['error'].startswith("Task 'broken' failed")
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    with pytest.raises(ValueError, match='cycle'):
+        TaskGraph().add('a', lambda deps: 1, ['b']).add('b', lambda deps: 1, ['a']).run()
+    with pytest.raises(ValueError, match='unknown task'):
+        TaskGraph().add('a', lambda deps: 1, ['missing']).run()
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def _record(self, name, result):
+        self.calls.append(name)
+        time.sleep(0.05)
+        return result
+
+    def get_cost_analysis(self, days=30):
+        rows = [{'TimePeriod': {'Start': f'2024-05-{day:02d}', 'End': f'2024-05-{day + 1:02d}'}} for day in range(1, 11)]
+        return self._record('get_cost_data', {'result': {'cost_data': rows}})
+
+    def get_usage_metrics_batch(self, metrics):
+        return self._record('get_usage_metrics_batch', {'result': {'results': [{'metric': m['metric']} for m in metrics]}})
+
+    def get_service_insights(self, services):
+        return self._record('get_service_insights', {'result': {service: {} for service in services}})
+
+    def get_ai_analysis(self, data):
+        return self._record('get_ai_analysis', {'result': {'days': len(data['cost_data'])}})
+
+    def close(self):
+        pass
+
+def test_run_once_reuses_cost_data_for_ai_analysis(tmp_path):
+    config = tmp_path / 'config.json'
+    config.write_text(json.dumps({
+        'server_url': 'https://mcp.example.com/dev',
+        'log_results': False,
+        'include_ai_analysis': True,
+        'usage_metrics': [{'service': 'AWS/EC2', 'metric': 'CPUUtilization'}]
+    }))
+    framework = MCPAutomationFramework(str(config))
+    framework.client = FakeClient()
+
+    results = framework.run_once()
+    assert results['ai_analysis'] == {'result': {'days': 7}}
+    assert results['usage_monitoring'] == [{'result': {'metric': 'CPUUtilization'}}]
+    # The cost data is fetched once and shared with the AI analysis
+    assert framework.client.calls.count('get_cost_data') == 1
+    report = framework.last_run_report['tasks']
+    cost_finished = report['cost_analysis']['start_ms'] + report['cost_analysis']['duration_ms']
+    assert report['ai_analysis']['start_ms'] >= cost_finished - 0.01
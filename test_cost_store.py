@@ -0,0 +1,28 @@
+from datetime import date
+from cost_store import SQLiteCostStore
+
+def cost_row(day: str, amount: str, estimated: bool) -> dict:
+    return {
+        'TimePeriod': {'Start': day, 'End': day},
+        'Total': {'BlendedCost': {'Amount': amount, 'Unit': 'USD'}},
+        'Groups': [],
+        'Estimated': estimated
+    }
+
+def test_estimated_rows_are_refetched(tmp_path):
+    store = SQLiteCostStore(str(tmp_path / 'costs.sqlite3'))
+    start, end = date(2024, 5, 1), date(2024, 5, 4)
+    store.put_rows('SERVICE', start, end, [
+        cost_row('2024-05-01', '10.0', False),
+        cost_row('2024-05-02', '11.0', True),
+        cost_row('2024-05-03', '12.0', True)
+    ])
+    assert store.missing_ranges('SERVICE', start, end) == [(date(2024, 5, 2), end)]
+
+    store.put_rows('SERVICE', date(2024, 5, 2), end, [
+        cost_row('2024-05-02', '11.5', False),
+        cost_row('2024-05-03', '12.5', True)
+    ])
+    assert store.missing_ranges('SERVICE', start, end) == [(date(2024, 5, 3), end)]
+    assert [row['Total']['BlendedCost']['Amount'] for row in store.get_rows('SERVICE', start, end)] == ['10.0', '11.5', '12.5']
+    store.close()
@@ -0,0 +1,81 @@
+import threading
+import time
+import pytest
+from fleet import FleetMCPServer
+
+class FakeServer:
+    """Stands in for a target's MCPServer"""
+
+    def __init__(self, name: str, region: str, delay: float = 0.0, error: str = None):
+        self.name, self.region, self.delay, self.error = name, region, delay, error
+
+    def handle_request(self, request):
+        time.sleep(self.delay)
+        if self.error:
+            return {'error': self.error}
+        return {'result': {'account': self.name, 'region': self.region, 'method': request['method']}}
+
+@pytest.fixture
+def fleet(monkeypatch):
+    targets = [
+        {'name': 'prod', 'regions': ['us-east-1', 'eu-west-1']},
+        {'name': 'dev'},
+        {'name': 'slow'},
+        {'name': 'broken'}
+    ]
+    fleet = FleetMCPServer(targets, target_timeout=0.5)
+    behaviour = {'slow': {'delay': 2.0}, 'broken': {'error': 'AccessDenied'}}
+    monkeypatch.setattr(fleet, 'server_for',
+                        lambda target, region: FakeServer(target['name'], region, **behaviour.get(target['name'], {})))
+    return fleet
+
+def test_region_methods_fan_out_and_merge(fleet):
+    started = time.perf_counter()
+    result = fleet.handle_request({'method': 'get_usage_metrics', 'params': {}})['result']
+    # Targets run concurrently, so the slow one only costs the timeout
+    assert time.perf_counter() - started < 1.5
+    assert set(result['targets']['prod']) == {'us-east-1', 'eu-west-1'}
+    assert result['targets']['prod']['eu-west-1']['result']['region'] == 'eu-west-1'
+    assert result['targets']['dev']['us-east-1']['result']['account'] == 'dev'
+    assert result['targets']['slow']['us-east-1'] == {'error': 'Target timed out after 0.5s'}
+    assert result['targets']['broken']['us-east-1']['error'] == 'AccessDenied'
+    assert (result['succeeded'], result['failed']) == (3, 2)
+
+def test_account_methods_run_once_per_account(fleet):
+    result = fleet.handle_request({'method': 'get_cost_data', 'params': {}})['result']
+    assert result['targets']['prod']['result']['region'] == 'us-east-1'
+    assert set(result['targets']) == {'prod', 'dev', 'slow', 'broken'}
+
+def test_unsupported_requests(fleet):
+    assert fleet.handle_request({'method': 'get_ai_analysis'})['error'].startswith('Method not supported')
+    assert fleet.handle_request({'method': 'get_cost_data', 'stream': True, 'id': 7}) == {
+        'error': 'Streaming is not supported in fleet mode', 'id': 7}
+
+def test_batch_entries_run_concurrently_and_are_validated(fleet, monkeypatch):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def fan_out(method, params):
+        with lock:
+            running.append(method)
+            peak.append(len(running))
+        time.sleep(0.1)
+        with lock:
+            running.remove(method)
+        return method
+    monkeypatch.setattr(fleet, '_fan_out', fan_out)
+
+    responses = fleet.handle_request([
+        {'id': 'a', 'method': 'get_cost_data'},
+        'junk',
+        {'method': 'get_cost_data', 'stream': True},
+        {'method': 'get_usage_metrics'}
+    ])
+    assert responses == [
+        {'result': 'get_cost_data', 'id': 'a'},
+        {'id': 1, 'error': 'Batch entries must be request objects'},
+        {'id': 2, 'error': 'Streaming is not supported inside a batch'},
+        {'result': 'get_usage_metrics', 'id': 3}
+    ]
+    assert max(peak) == 2
@@ -0,0 +1,8 @@
+from instrumentation import Metrics
+
+def test_prometheus_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.observe('aws', 'ce:Get"Cost\\And\nUsage', 12.0)
+    text = metrics.prometheus_text()
+    assert 'operation="ce:Get\\"Cost\\\\And\\nUsage"' in text
+    assert all(line.startswith(('#', 'mcp_')) for line in text.splitlines())
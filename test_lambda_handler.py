@@ -0,0 +1,27 @@
+import json
+import pytest
+import lambda_handler
+
+@pytest.fixture
+def fleet_handler(monkeypatch):
+    monkeypatch.setenv('MCP_FLEET_CONFIG', json.dumps([{'name': 'prod'}]))
+    lambda_handler.reset_server()
+    yield lambda_handler.lambda_handler
+    lambda_handler.reset_server()
+
+def test_fleet_stream_request_is_refused_as_json(fleet_handler):
+    response = fleet_handler({'body': json.dumps({'method': 'get_cost_data', 'stream': True})}, None)
+    assert response['statusCode'] == 400
+    assert response['headers']['Content-Type'] == 'application/json'
+    body = json.loads(response['body'])
+    assert body['error'] == 'Streaming is not supported in fleet mode'
+    assert '_meta' in body
+
+def test_unknown_methods_share_one_metric_label(monkeypatch):
+    monkeypatch.delenv('MCP_FLEET_CONFIG', raising=False)
+    lambda_handler.reset_server()
+    for method in ('no_such_method', 'evil"\nmethod'):
+        lambda_handler.lambda_handler({'body': json.dumps({'method': method})}, None)
+    labels = {name for kind, name in lambda_handler.get_server().metrics._series if kind == 'serialize'}
+    assert labels == {'unknown'}
+    lambda_handler.reset_server()
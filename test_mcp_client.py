@@ -0,0 +1,62 @@
+import json
+import pytest
+from mcp_client import MCPClient, batch_responses, classify_response, is_throttled
+
+class FakeResponse:
+    def __init__(self, status_code: int, body, headers: dict = None):
+        self.status_code = status_code
+        self.text = body if isinstance(body, str) else json.dumps(body)
+        self.headers = headers or {}
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr('mcp_client.time.sleep', lambda seconds: None)
+    return MCPClient('https://mcp.example.com/dev', max_retries=3)
+
+def script(client, monkeypatch, responses):
+    """Make the client's session answer with ``responses`` in turn; returns the call log"""
+    calls = []
+
+    def post(*args, **kwargs):
+        calls.append(kwargs)
+        return responses[min(len(calls), len(responses)) - 1]
+    monkeypatch.setattr(client.session, 'post', post)
+    return calls
+
+def test_classify_response():
+    assert classify_response(200, '{"result": 1}') == ({'result': 1}, None, None)
+    result, error, retry_after = classify_response(200, '{"error": "x", "retryable": true, "retry_after": 2}')
+    assert result is None and retry_after == 2
+    assert classify_response(503, 'busy', '1')[1:] == ({'error': 'HTTP 503: busy'}, '1')
+    assert classify_response(500, '{"error": "boom", "retryable": true}')[0] is None
+    assert classify_response(500, '{"error": "bad request"}')[1] is None
+    assert classify_response(504, 'Endpoint request timed out')[1] is None
+    assert not is_throttled({'error': 'Rate exceeded', 'retryable': False})
+    assert is_throttled({'error': 'ThrottlingException: Rate exceeded'})
+
+def test_deterministic_500_is_not_retried(client, monkeypatch):
+    calls = script(client, monkeypatch, [FakeResponse(500, {'error': 'Expecting value'})])
+    assert client.send_request('get_cost_data') == {'error': 'HTTP 500: {"error": "Expecting value"}'}
+    assert len(calls) == 1
+
+def test_gateway_timeout_is_not_retried(client, monkeypatch):
+    calls = script(client, monkeypatch, [FakeResponse(504, 'Endpoint request timed out')])
+    assert 'error' in client.send_request('get_cost_data')
+    assert len(calls) == 1
+
+def test_throttling_is_retried(client, monkeypatch):
+    calls = script(client, monkeypatch, [
+        FakeResponse(429, 'slow down', {'Retry-After': '0'}),
+        FakeResponse(200, {'error': 'Rate exceeded', 'retryable': True}),
+        FakeResponse(200, {'result': {'ok': True}})
+    ])
+    assert client.send_request('get_cost_data') == {'result': {'ok': True}}
+    assert len(calls) == 3
+    assert client.latency_stats()['retries'] == 2
+
+def test_batch_responses_follow_call_order():
+    response = [{'id': 1, 'result': 'b'}, {'id': 0, 'result': 'a'}]
+    assert batch_responses(response, 3) == [
+        {'id': 0, 'result': 'a'}, {'id': 1, 'result': 'b'}, {'id': 2, 'error': 'Missing response in batch'}
+    ]
+    assert batch_responses({'error': 'HTTP 502'}, 2) == [{'id': 0, 'error': 'HTTP 502'}, {'id': 1, 'error': 'HTTP 502'}]
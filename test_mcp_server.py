@@ -0,0 +1,26 @@
+from mcp_server import MCPServer
+
+def cost_row(day: str, estimated: bool) -> dict:
+    return {'TimePeriod': {'Start': day, 'End': day}, 'Total': {}, 'Groups': [], 'Estimated': estimated}
+
+def test_recent_cost_window_expires(monkeypatch):
+    server = MCPServer()
+    monkeypatch.setattr(server, '_fetch_cost_and_usage',
+                        lambda start, end, granularity, group_by: [cost_row(str(start), False)])
+    server._load_cost_data({'days': 7})
+    (entry,) = server.cost_cache.backend._entries.values()
+    # The window ends today, so Cost Explorer may still revise it
+    assert entry['expires_at'] is not None
+
+def test_batch_validates_entries_and_keeps_order():
+    server = MCPServer()
+    responses = server.handle_request([
+        {'id': 'stats', 'method': 'get_cache_stats'},
+        ['not', 'a', 'request'],
+        {'method': 'get_cost_data', 'stream': True},
+        {'method': 'no_such_method'}
+    ])
+    assert responses[0]['id'] == 'stats' and 'result' in responses[0]
+    assert responses[1] == {'id': 1, 'error': 'Batch entries must be request objects'}
+    assert responses[2] == {'id': 2, 'error': 'Streaming is not supported inside a batch'}
+    assert responses[3] == {'id': 3, 'error': 'Unknown method: no_such_method'}
@@ -0,0 +1,24 @@
+import os
+import time
+from response_cache import FileCacheBackend, ResponseCache
+
+def test_callable_ttl_sees_the_value():
+    cache = ResponseCache()
+    cache.get_or_compute('final', lambda: {'estimated': False}, ttl=lambda value: None if not value['estimated'] else 300)
+    cache.get_or_compute('estimated', lambda: {'estimated': True}, ttl=lambda value: None if not value['estimated'] else 300)
+    assert cache.backend.get('final')['expires_at'] is None
+    assert cache.backend.get('estimated')['expires_at'] is not None
+
+def test_file_backend_is_capped(tmp_path):
+    backend = FileCacheBackend(str(tmp_path), max_entries=3, max_age_seconds=3600)
+    for index in range(5):
+        backend.set(f'key{index}', {'value': index})
+        # Distinct mtimes, so eviction order is deterministic
+        os.utime(backend._path(f'key{index}'), (time.time() - 100 + index,) * 2)
+    assert len(os.listdir(tmp_path)) == 3
+    assert backend.get('key4') == {'value': 4}
+    assert backend.get('key0') is None
+
+    os.utime(backend._path('key2'), (time.time() - 7200,) * 2)
+    backend.set('key5', {'value': 5})
+    assert backend.get('key2') is None
@@ -0,0 +1,68 @@
+import threading
+import time
+import pytest
+from scheduler import JobScheduler
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not met in time'
+        time.sleep(0.01)
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scheduler = JobScheduler(state_file=str(tmp_path / 'state.json'), max_workers=2)
+    yield scheduler
+    scheduler.stop(wait=False)
+
+def test_running_job_is_skipped(scheduler):
+    release = threading.Event()
+    job = scheduler.every(60, 'slow', release.wait)
+    scheduler.run_pending()
+    wait_for(lambda: job.metrics['last_status'] == 'running')
+
+    scheduler.run_pending(now=job.next_run)
+    assert job.metrics['skipped'] == 1
+    release.set()
+    wait_for(lambda: job.metrics['last_status'] == 'success')
+    assert job.running_since is None
+
+def test_timed_out_run_is_not_overlapped(scheduler):
+    release = threading.Event()
+    calls = []
+
+    def hang():
+        calls.append(time.time())
+        release.wait()
+
+    job = scheduler.every(60, 'hung', hang, timeout=0.1, skip_if_running=False)
+    scheduler.run_pending()
+    wait_for(lambda: job.metrics['last_status'] == 'timeout')
+    assert job.metrics['timeouts'] == 1
+    assert scheduler.metrics()['hung']['overrunning']
+
+    # The abandoned call still runs, so the next run is skipped rather than overlapping it
+    scheduler.run_pending(now=job.next_run)
+    assert job.metrics['skipped'] == 1
+    assert len(calls) == 1
+
+    release.set()
+    wait_for(lambda: job.running_since is None)
+    assert not job.overrunning
+    assert job.metrics['last_status'] == 'timeout'
+
+    release.clear()
+    scheduler.run_pending(now=job.next_run)
+    wait_for(lambda: len(calls) == 2)
+    release.set()
+
+def test_timeout_frees_the_worker(tmp_path):
+    scheduler = JobScheduler(state_file=str(tmp_path / 'state.json'), max_workers=1)
+    release = threading.Event()
+    done = threading.Event()
+    scheduler.every(60, 'hung', release.wait, timeout=0.1)
+    scheduler.every(60, 'quick', done.set)
+    scheduler.run_pending()
+    assert done.wait(5)
+    release.set()
+    scheduler.stop(wait=False)
@@ -0,0 +1,66 @@
+import threading
+import time
+import pytest
+from single_flight import SingleFlight
+
+def wait_for_coalesced(flight: SingleFlight, count: int, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while flight.stats()['coalesced'] < count:
+        assert time.monotonic() < deadline, 'callers were not coalesced'
+        time.sleep(0.005)
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+    outcomes = []
+
+    def fetch():
+        executions.append(1)
+        release.wait()
+        return {'cost': 42}
+
+    threads = [threading.Thread(target=lambda: outcomes.append(flight.do('cost:30', fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    wait_for_coalesced(flight, 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert sorted(shared for _, shared in outcomes) == [False] + [True] * 7
+    assert all(value is outcomes[0][0] for value, _ in outcomes)
+    assert flight.stats()['in_flight'] == 0
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        release.wait()
+        raise RuntimeError('Throttled')
+
+    def call():
+        try:
+            flight.do('key', fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for_coalesced(flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert errors == ['Throttled'] * 3
+
+def test_later_calls_execute_again():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == (1, False)
+    assert flight.do('key', lambda: 2) == (2, False)
+    with pytest.raises(ValueError):
+        flight.do('key', lambda: int('x'))
+    assert flight.stats()['executions'] == 3
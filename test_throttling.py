@@ -0,0 +1,44 @@
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+from throttling import CircuitOpenError, ServiceGuard, is_retryable
+
+def throttle():
+    return ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'},
+                        'ResponseMetadata': {'HTTPStatusCode': 400}}, 'GetCostAndUsage')
+
+def flaky(errors, result='ok'):
+    """A call that raises each of ``errors`` in turn, then returns ``result``"""
+    pending = list(errors)
+
+    def call():
+        if pending:
+            raise pending.pop(0)
+        return result
+    return call
+
+@pytest.fixture
+def guard(monkeypatch):
+    monkeypatch.setattr('throttling.time.sleep', lambda seconds: None)
+    return ServiceGuard('ce', rate=1000)
+
+def test_throttle_burst_does_not_open_breaker(guard):
+    for _ in range(2):
+        with pytest.raises(ClientError):
+            guard.call(flaky([throttle()] * guard.max_attempts))
+    assert guard.breaker.state == 'closed'
+    assert guard.call(flaky([throttle()] * (guard.max_attempts - 1))) == 'ok'
+
+def test_connection_error_is_retried(guard):
+    error = EndpointConnectionError(endpoint_url='https://ce.us-east-1.amazonaws.com')
+    assert is_retryable(error)
+    assert is_retryable(ReadTimeoutError(endpoint_url='https://ce.us-east-1.amazonaws.com'))
+    assert guard.call(flaky([error])) == 'ok'
+    assert guard.counters['retries'] == 1
+
+def test_connection_errors_open_breaker(guard):
+    error = EndpointConnectionError(endpoint_url='https://ce.us-east-1.amazonaws.com')
+    with pytest.raises(EndpointConnectionError):
+        guard.call(flaky([error] * guard.max_attempts))
+    with pytest.raises(CircuitOpenError):
+        guard.call(flaky([error] * guard.max_attempts))
+    assert guard.breaker.state == 'open'
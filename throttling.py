@@ -0,0 +1,299 @@
+import random
+import threading
+import time
+from typing import Any, Callable, Dict
+
+# AWS error codes that mean "slow down"
+THROTTLING_ERROR_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'LimitExceededException',
+    'ProvisionedThroughputExceededException',
+    'SlowDown'
+}
+# Transient server-side failures, retried like throttles but without slowing the limiter
+TRANSIENT_ERROR_CODES = {
+    'InternalError',
+    'InternalFailure',
+    'InternalServerException',
+    'ServiceUnavailable',
+    'ServiceUnavailableException',
+    'ModelNotReadyException'
+}
+
+# Starting request rates (per second) for each service's shared limiter; the
+# limiter probes upwards from here and backs off when AWS throttles.
+DEFAULT_RATES = {
+    'ce': 5,
+    'cloudwatch': 40,
+    'bedrock-runtime': 10,
+    'ec2': 50,
+    'sts': 20
+}
+DEFAULT_RATE = 20
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open"""
+
+    def __init__(self, service: str, retry_after: float):
+        super().__init__(f'Circuit open for {service} after repeated failures; retry after {retry_after:.1f}s')
+        self.service = service
+        self.retry_after = retry_after
+
+def error_code(error: Exception) -> str:
+    # botocore ClientError, matched by shape so botocore is not imported eagerly
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code', '')
+    if isinstance(error, CircuitOpenError):
+        return 'CircuitOpen'
+    return ''
+
+def http_status(error: Exception) -> int:
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+    return 0
+
+def is_throttle(error: Exception) -> bool:
+    return error_code(error) in THROTTLING_ERROR_CODES or http_status(error) == 429
+
+def is_connection_error(error: Exception) -> bool:
+    """Connection failures and timeouts, which carry no AWS error code"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # Only reached once a call has failed, by which time botocore is loaded anyway
+    from botocore.exceptions import ConnectionError as BotocoreConnectionError, HTTPClientError
+    return isinstance(error, (BotocoreConnectionError, HTTPClientError))
+
+def is_transient(error: Exception) -> bool:
+    """Failures that say the service (or the way to it) is unhealthy"""
+    return error_code(error) in TRANSIENT_ERROR_CODES or http_status(error) >= 500 or is_connection_error(error)
+
+def is_retryable(error: Exception) -> bool:
+    return is_throttle(error) or is_transient(error) or error_code(error) == 'CircuitOpen'
+
+class AdaptiveTokenBucket:
+    """Token bucket whose refill rate adapts to throttling (AIMD).
+
+    Each throttle halves the rate (down to ``min_rate``); each success adds
+    a small step back (up to ``max_rate``), so sustained throughput settles
+    just under the service quota instead of bursting into it.
+    """
+
+    def __init__(self, rate: float, burst: float = None, min_rate: float = 0.2, max_rate: float = None):
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.max_rate = float(max_rate if max_rate is not None else rate * 4)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and rejects calls
+    for ``reset_timeout`` seconds, then lets a single trial call through."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def check(self, service: str):
+        """Raise CircuitOpenError unless a call may proceed"""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if self.state == 'open' and elapsed >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            raise CircuitOpenError(service, max(self.reset_timeout - elapsed, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+class RetryBudget:
+    """Caps retries to a fraction of recent traffic so retries cannot snowball"""
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+class ServiceGuard:
+    """Rate limiter, circuit breaker and retry budget for one AWS service.
+
+    The limiter is driven by botocore hooks on every HTTP call (paginator
+    pages included); ``call`` adds retries and circuit breaking around an
+    operation.
+    """
+
+    def __init__(self, service: str, rate: float, max_attempts: int = 4,
+                 backoff_base: float = 0.2, backoff_max: float = 5.0):
+        self.service = service
+        self.limiter = AdaptiveTokenBucket(rate)
+        self.breaker = CircuitBreaker()
+        self.budget = RetryBudget()
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.counters = {'calls': 0, 'throttles': 0, 'retries': 0, 'budget_exhausted': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def attach(self, client):
+        """Route every API call of a botocore client through the limiter"""
+        client.meta.events.register('before-call', self._before_call)
+        client.meta.events.register('after-call', self._after_call)
+
+    def _before_call(self, **kwargs):
+        self.limiter.acquire()
+        self._count('calls')
+
+    def _after_call(self, http_response=None, parsed=None, **kwargs):
+        code = (parsed or {}).get('Error', {}).get('Code', '')
+        status = getattr(http_response, 'status_code', 200)
+        if code in THROTTLING_ERROR_CODES or status == 429:
+            self._count('throttles')
+            self.limiter.on_throttle()
+        elif status < 400:
+            self.limiter.on_success()
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn`` with throttle-aware retries under the circuit breaker.
+
+        Throttles and transient failures (5xx, connection errors, timeouts)
+        are retried within the retry budget; only transient failures count
+        towards opening the breaker.
+        """
+        attempt = 0
+        while True:
+            try:
+                self.breaker.check(self.service)
+            except CircuitOpenError:
+                self._count('rejected')
+                raise
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                throttled = is_throttle(e)
+                if throttled or not is_transient(e):
+                    # The service answered. A throttle only slows the limiter (in the
+                    # after-call hook) and a client-side error says nothing about its health.
+                    self.breaker.record_success()
+                    if not throttled:
+                        raise
+                else:
+                    self.breaker.record_failure()
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    raise
+                if not self.budget.withdraw():
+                    self._count('budget_exhausted')
+                    raise
+                self._count('retries')
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt))))
+                continue
+            self.breaker.record_success()
+            self.budget.deposit()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        counters.update({
+            'rate_per_second': round(self.limiter.rate, 3),
+            'circuit': self.breaker.state,
+            'retry_tokens': round(self.budget.tokens, 2)
+        })
+        return counters
+
+# Process-wide guards, shared by every MCPServer (and warm Lambda invocation)
+_GUARDS = {}
+_GUARDS_LOCK = threading.Lock()
+
+def get_guard(service: str, region: str = None, scope: str = None) -> ServiceGuard:
+    """Shared guard for a service in a region; ``scope`` (e.g. an account) keeps separate guards"""
+    key = f'{service}:{region or "default"}'
+    if scope:
+        key = f'{scope}/{key}'
+    with _GUARDS_LOCK:
+        if key not in _GUARDS:
+            _GUARDS[key] = ServiceGuard(service, DEFAULT_RATES.get(service, DEFAULT_RATE))
+        return _GUARDS[key]
+
+def guard_stats() -> Dict[str, Dict]:
+    with _GUARDS_LOCK:
+        guards = dict(_GUARDS)
+    return {key: guard.stats() for key, guard in guards.items()}
+
+def configure_service(service: str, rate: float):
+    """Set the request rate for a service's limiters (e.g. after a quota increase)"""
+    with _GUARDS_LOCK:
+        DEFAULT_RATES[service] = rate
+        guards = [guard for guard in _GUARDS.values() if guard.service == service]
+    for guard in guards:
+        guard.limiter = AdaptiveTokenBucket(rate)